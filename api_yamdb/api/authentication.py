@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+from .cache import LocalStore, state_cache
+
+# Поля пользователя, которых достаточно для проверки прав.
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'token_version', *User.TOKEN_FIELDS)
+]
+# Данные пользователей, загруженные этим процессом; сбрасываются сигналом
+# при изменении пользователя (см. api.signals).
+user_cache = LocalStore(settings.USER_CACHE_SIZE)
+
+# Версия для удалённых и неактивных пользователей, не совпадает ни с одной.
+REVOKED_VERSION = -1
+
+
+def get_token_version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов пользователя, кэшируемая на короткое время."""
+    key = get_token_version_key(user_id)
+    version = state_cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id, is_active=True).values_list(
+            'token_version', flat=True).first()
+        if version is None:
+            version = REVOKED_VERSION
+        state_cache.set(key, version, settings.TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+class ClaimsAccessToken(AccessToken):
+    """Токен доступа с данными пользователя, нужными для проверки прав."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in User.TOKEN_FIELDS:
+            token[field] = getattr(user, field)
+        token['token_version'] = user.token_version
+        return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Аутентификация без загрузки пользователя из базы данных.
+
+    Пользователь собирается из данных токена; поля, которых нет в токене,
+    загружаются при первом обращении. Токен отклоняется, если его версия
+    отличается от версии пользователя (роль или статус изменились).
+    Для токенов без этих данных пользователь берётся из кэша процесса.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if 'token_version' not in validated_token:
+            return self.get_cached_user(user_id)
+        if get_token_version(user_id) != validated_token['token_version']:
+            raise AuthenticationFailed(
+                'Токен отозван', code='token_revoked')
+        claims = {
+            field: validated_token[field] for field in User.TOKEN_FIELDS}
+        claims['id'] = user_id
+        claims['token_version'] = validated_token['token_version']
+        return User.from_db(
+            DEFAULT_DB_ALIAS, USER_FIELDS,
+            [claims[name] for name in USER_FIELDS])
+
+    def get_cached_user(self, user_id):
+        """Пользователь для токена без данных о нём: из кэша процесса
+        или одним запросом только нужных полей."""
+        values = user_cache.get(user_id)
+        if values is None:
+            values = User.objects.filter(pk=user_id).values_list(
+                *USER_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    'Пользователь не найден', code='user_not_found')
+            user_cache.set(user_id, values, settings.USER_CACHE_TIMEOUT)
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                'Пользователь неактивен', code='user_inactive')
+        return user
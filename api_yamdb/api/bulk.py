@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+
+def get_bulk_items(data):
+    """Проверяет, что тело запроса — непустой список допустимой длины."""
+    if not isinstance(data, list) or not data:
+        raise ValidationError({'detail': 'Ожидается непустой список.'})
+    if len(data) > settings.BULK_MAX_ITEMS:
+        raise ValidationError({
+            'detail': 'Слишком много элементов: '
+                      f'не больше {settings.BULK_MAX_ITEMS} за запрос.'})
+    return data
+
+
+def get_lookup(item, field):
+    """Значение поля, по которому ищется объект: из словаря или сама
+    строка."""
+    value = item.get(field) if isinstance(item, dict) else item
+    return value if isinstance(value, str) else None
+
+
+def error_result(errors, status_code=status.HTTP_400_BAD_REQUEST):
+    return {'status': status_code, 'errors': errors}
+
+
+def validate_item(child, item, instance=None):
+    """Проверяет один элемент дочерним сериализатором списка.
+
+    ListSerializer отклоняет весь список при первой же ошибке, поэтому
+    элементы проверяются по одному, а ошибки возвращаются для каждого.
+    """
+    if not isinstance(item, dict):
+        raise ValidationError({'detail': 'Ожидается объект.'})
+    child.instance = instance
+    try:
+        return child.run_validation(item)
+    finally:
+        child.instance = None
+
+
+def find_duplicates(items, field):
+    """Индексы элементов, повторяющих значение поля из более ранних."""
+    seen, duplicates = set(), set()
+    for index, data in items.items():
+        value = data.get(field)
+        if value is None:
+            continue
+        if value in seen:
+            duplicates.add(index)
+        seen.add(value)
+    return duplicates
+
+
+def get_next_sqlite_id(connection, model):
+    """Следующий id таблицы SQLite с AUTOINCREMENT.
+
+    Учитывает и удалённые строки (sqlite_sequence), чтобы их id не
+    использовались повторно. Пустой UPDATE сначала захватывает блокировку
+    записи: параллельная транзакция дождётся фиксации этой и прочитает уже
+    новое значение. Вызывать внутри транзакции.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = seq WHERE name = %s', [table])
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+        row = cursor.fetchone()
+    last = model.objects.aggregate(last=Max('id'))['last']
+    return max(row[0] if row else 0, last or 0) + 1
+
+
+def bulk_create_with_ids(model, objects):
+    """bulk_create, после которого у всех объектов заполнен id.
+
+    Если база данных не возвращает id вставленных строк, на SQLite они
+    назначаются заранее после последнего выданного, а на остальных
+    базах объекты сохраняются по одному. Вызывать внутри транзакции.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(
+            objects, batch_size=settings.BULK_BATCH_SIZE)
+    elif connection.vendor == 'sqlite':
+        start = get_next_sqlite_id(connection, model)
+        for pk, instance in enumerate(objects, start):
+            instance.pk = pk
+        model.objects.bulk_create(
+            objects, batch_size=settings.BULK_BATCH_SIZE)
+    else:
+        for instance in objects:
+            instance.save(force_insert=True)
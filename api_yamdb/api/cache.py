@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+from time import monotonic, time_ns
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response
+from django.utils.connection import ConnectionProxy
+from rest_framework.response import Response
+
+from .conditional import VALIDATOR_HEADERS
+
+CATALOGUE_NAMESPACE = 'catalogue'
+HITS_KEY = 'response_cache:hits'
+MISSES_KEY = 'response_cache:misses'
+LOCAL_STORE_SIZE = 10000
+STATE_CACHE_ALIAS = 'state'
+
+# Версии пространств ключей, счётчики и прочее состояние, которое не должны
+# вытеснять записи кэша ответов.
+state_cache = ConnectionProxy(caches, STATE_CACHE_ALIAS)
+
+
+class LocalStore:
+    """Кэш в памяти процесса со сроком жизни записей.
+
+    Хранит не больше max_size ключей, вытесняя давно не использовавшиеся.
+    """
+
+    def __init__(self, max_size=LOCAL_STORE_SIZE):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            expires, value = self.data.get(key, (0, None))
+            if expires < monotonic():
+                self.data.pop(key, None)
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self._put(key, value, timeout)
+
+    def add(self, key, value, timeout):
+        """Записывает значение, только если ключа нет, как cache.add."""
+        with self.lock:
+            expires, _ = self.data.get(key, (0, None))
+            if expires >= monotonic():
+                return False
+            self._put(key, value, timeout)
+            return True
+
+    def incr(self, key, delta=1):
+        """Атомарно изменяет число, как cache.incr: ValueError, если ключа
+        нет."""
+        with self.lock:
+            expires, value = self.data.get(key, (0, None))
+            if expires < monotonic():
+                self.data.pop(key, None)
+                raise ValueError(f'Ключ {key!r} не найден')
+            self.data[key] = (expires, value + delta)
+            return value + delta
+
+    def decr(self, key, delta=1):
+        return self.incr(key, -delta)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def _put(self, key, value, timeout):
+        self.data[key] = (monotonic() + timeout, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+
+
+def get_version(namespace):
+    """Возвращает текущую версию пространства ключей кэша."""
+    key = f'version:{namespace}'
+    version = state_cache.get(key)
+    if version is None:
+        state_cache.add(key, time_ns(), timeout=None)
+        version = state_cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Делает устаревшими все ключи пространства за одну операцию."""
+    key = f'version:{namespace}'
+    try:
+        state_cache.incr(key)
+    except ValueError:
+        state_cache.add(key, time_ns(), timeout=None)
+
+
+def get_count_namespace(model):
+    """Пространство ключей кэша количества объектов модели."""
+    return f'count:{model._meta.label_lower}'
+
+
+def increment_counter(key):
+    try:
+        state_cache.incr(key)
+    except ValueError:
+        state_cache.add(key, 1, timeout=None)
+
+
+def response_cache_stats():
+    """Возвращает число попаданий и промахов кэша ответов."""
+    return {
+        'hits': state_cache.get(HITS_KEY, 0),
+        'misses': state_cache.get(MISSES_KEY, 0),
+    }
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    return 'admin' if user.is_admin() else user.role
+
+
+def get_response_cache_key(request, namespace, names):
+    """Ключ ответа: адрес, отсортированные параметры запроса из names и
+    роль."""
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        if name in names
+        for value in values
+    )
+    signature = md5(repr((
+        request.build_absolute_uri(request.path),
+        params,
+        get_role(request.user),
+    )).encode()).hexdigest()
+    return f'response:{namespace}:{get_version(namespace)}:{signature}'
+
+
+class CachedResponseMixin:
+    """Кэширует успешные ответы на чтение.
+
+    Кэш сбрасывается сменой версии пространства ключей при изменении
+    каталога (см. api.signals). Вместе с данными сохраняются заголовки
+    ETag/Last-Modified, поэтому условный запрос к закэшированному ответу
+    получает 304 без обращения к базе данных.
+    """
+    cache_namespace = CATALOGUE_NAMESPACE
+
+    def get_cache_params(self):
+        """Параметры запроса, от которых зависит ответ: фильтры, поиск и
+        сортировка."""
+        params = set()
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(filterset_class.base_filters)
+        for backend in self.filter_backends:
+            for attribute in ('search_param', 'ordering_param'):
+                params.add(getattr(backend, attribute, None))
+        params.discard(None)
+        return params
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        names = self.get_cache_params()
+        if not names.issuperset(request.query_params):
+            # Каждый лишний параметр создавал бы новую запись кэша.
+            return handler(request, *args, **kwargs)
+        key = get_response_cache_key(request, self.cache_namespace, names)
+        cached = cache.get(key)
+        if cached is not None:
+            increment_counter(HITS_KEY)
+            data, headers = cached
+            response = get_conditional_response(
+                request, etag=headers.get('ETag'))
+            if response is None:
+                response = Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+        increment_counter(MISSES_KEY)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                name: response[name]
+                for name in VALIDATOR_HEADERS if response.has_header(name)
+            }
+            cache.set(key, (response.data, headers),
+                      settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    def get_cache_params(self):
+        params = super().get_cache_params()
+        for attribute in ('page_query_param', 'page_size_query_param',
+                          'mode_query_param', 'cursor_query_param'):
+            params.add(getattr(self.paginator, attribute, None))
+        params.discard(None)
+        return params
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,94 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def has_validators(request):
+    """Проверяет, прислал ли клиент заголовки условного запроса."""
+    return ('HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+
+def make_etag(request, state):
+    return 'W/' + quote_etag(
+        md5(repr((request.get_full_path(), state)).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """Поддержка условных GET-запросов через ETag и Last-Modified.
+
+    Валидаторы строятся по полю updated_at: для объекта это его значение,
+    для страницы списка — пары (pk, updated_at) и общее количество. Обычный
+    ответ получает ETag из уже загруженных объектов, а запрос с
+    If-None-Match или If-Modified-Since сначала сверяется лёгким запросом
+    только этих колонок и при совпадении получает 304 без сериализации.
+    Страницы в курсорном режиме пагинации отдаются без ETag.
+    """
+    modified_field = 'updated_at'
+
+    def is_keyset_request(self, request):
+        is_keyset = getattr(self.paginator, 'is_keyset', None)
+        return is_keyset is not None and is_keyset(request)
+
+    def list(self, request, *args, **kwargs):
+        if has_validators(request) and not self.is_keyset_request(request):
+            queryset = self.filter_queryset(
+                self.get_queryset()
+            ).prefetch_related(None).values_list('pk', self.modified_field)
+            rows = self.paginate_queryset(queryset)
+            if rows is None:
+                rows = list(queryset)
+            response = self.get_not_modified_response(
+                request, self.get_list_state(rows))
+            if response is not None:
+                return response
+        response = super().list(request, *args, **kwargs)
+        page = getattr(getattr(self, 'paginator', None), 'page', None)
+        if response.status_code == 200 and page is not None:
+            response['ETag'] = make_etag(request, self.get_list_state([
+                (obj.pk, getattr(obj, self.modified_field))
+                for obj in page.object_list
+            ]))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if has_validators(request):
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            modified = self.get_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(self.modified_field, flat=True).first()
+            if modified is not None:
+                response = self.get_not_modified_response(
+                    request, modified, modified)
+                if response is not None:
+                    return response
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200:
+            modified = getattr(self.object, self.modified_field)
+            response['ETag'] = make_etag(request, modified)
+            response['Last-Modified'] = http_date(modified.timestamp())
+        return response
+
+    def get_object(self):
+        self.object = super().get_object()
+        return self.object
+
+    def get_list_state(self, rows):
+        """Состояние страницы: количество объектов и их версии."""
+        page = getattr(self.paginator, 'page', None)
+        count = page.paginator.count if page is not None else None
+        return (count, [tuple(row) for row in rows])
+
+    def get_not_modified_response(self, request, state, modified=None):
+        etag = make_etag(request, state)
+        last_modified = int(modified.timestamp()) if modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
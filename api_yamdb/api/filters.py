@@ -1,13 +1,13 @@
 from django_filters import rest_framework as django_filters
 from reviews.models import Title
 
+from .slugs import slug_maps
+
 
 class TitleFilter(django_filters.FilterSet):
     """Фильтр для произведений."""
-    genre = django_filters.CharFilter(
-        field_name='genre__slug', lookup_expr='exact')
-    category = django_filters.CharFilter(
-        field_name='category__slug', lookup_expr='exact')
+    genre = django_filters.CharFilter(method='filter_slug')
+    category = django_filters.CharFilter(method='filter_slug')
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains')
     year = django_filters.NumberFilter(
@@ -16,3 +16,12 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ('genre', 'category', 'name', 'year')
+
+    def filter_slug(self, queryset, name, value):
+        """Фильтрует по id, найденному по slug без запроса к базе данных,
+        поэтому таблицы категорий и жанров в запрос не попадают."""
+        model = Title._meta.get_field(name).related_model
+        pk = slug_maps[model].get_id(value)
+        if pk is None:
+            return queryset.none()
+        return queryset.filter(**{name: pk})
@@ -0,0 +1,217 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_count_namespace, get_version
+
+CURSOR_MODE = 'cursor'
+
+
+def estimate_count(queryset, sql, params):
+    """Оценка числа строк по плану запроса PostgreSQL.
+
+    Возвращает None, если оценка недоступна или меньше порога
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD: тогда считается точно.
+    """
+    threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    connection = connections[queryset.db]
+    if not threshold or connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    return rows if rows >= threshold else None
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Количество кэшируется по тексту запроса (то есть по набору фильтров) на
+    PAGINATION_COUNT_CACHE_TIMEOUT секунд и сбрасывается при изменении
+    модели (см. api.signals). На больших таблицах PostgreSQL вместо точного
+    значения используется оценка планировщика.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        namespace = get_count_namespace(queryset.model)
+        key = 'count:{}:{}'.format(
+            get_version(namespace),
+            md5(repr((sql, params)).encode()).hexdigest(),
+        )
+        count = cache.get(key)
+        if count is None:
+            count = estimate_count(queryset, sql, params)
+            if count is None:
+                count = queryset.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CachedCountPageNumberPagination(PageNumberPagination):
+    django_paginator_class = CachedCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по уникальному упорядочиванию (keyset).
+
+    Курсор хранит значения полей упорядочивания у крайнего объекта
+    страницы, следующая страница выбирается условием «строго после этих
+    значений». Запросов COUNT(*) и OFFSET нет, поэтому стоимость страницы
+    не зависит от её глубины. Последнее поле упорядочивания должно быть
+    уникальным (обычно id).
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(after_position(ordering, position))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.results = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        return self.encode_cursor(self.results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.results:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.results[0], reverse=True)
+
+    def decode_cursor(self, request, model):
+        """Позиция и направление из курсора. Значения приходят от клиента,
+        поэтому проверяются полями модели, как данные формы."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (BinasciiError, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                model._meta.get_field(field.lstrip('-')).clean(value, None)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (DjangoValidationError, ValidationError, TypeError,
+                ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            getattr(obj, field.lstrip('-')) for field in self.ordering
+        ]
+        encoded = urlsafe_b64encode(json.dumps(
+            {'p': position, 'r': int(reverse)}, default=str
+        ).encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded)
+
+
+def invert(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def after_position(ordering, position):
+    """Условие «строго после position» для заданного упорядочивания.
+
+    Для (a, b, c) это a > x OR (a = x AND b > y) OR (a = x AND b = y
+    AND c > z), где направление сравнения берётся из знака поля.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class PageNumberOrKeysetPagination(CachedCountPageNumberPagination):
+    """Постраничная пагинация с включаемым курсорным режимом.
+
+    По умолчанию ответ прежний: count, next, previous, results. С параметром
+    pagination=cursor используется KeysetPagination по полю
+    keyset_ordering вьюсета, а ссылки next/previous содержат курсор.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def is_keyset(self, request):
+        return request.query_params.get(self.mode_query_param) == CURSOR_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_keyset(request):
+            self.keyset = None
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPagination(view.keyset_ordering)
+        self.keyset.page_size = self.page_size
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -10,7 +10,7 @@ class IsAuthorModeratorOrAdminOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in SAFE_METHODS
-            or obj.author == request.user
+            or obj.author_id == request.user.id
             or request.user.is_moderator()
             or request.user.is_admin()
         )
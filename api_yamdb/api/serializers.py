@@ -3,6 +3,8 @@ from reviews.constants import EMAIL_MAX_LENGTH, USERNAME_MAX_LENGTH
 from reviews.models import Category, Comment, Genre, Review, Title, User
 from reviews.validators import username_validator
 
+from .slugs import slug_maps
+
 
 class UsernameValidationMixin():
     def validate_username(self, username):
@@ -36,13 +38,27 @@ class TitleReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет объект в соответствии slug → id
+    процесса, а не запросом к базе данных."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        instance = slug_maps[self.get_queryset().model].get_object(data)
+        if instance is None:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=data)
+        return instance
+
+
 class TitleCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания/обновления произведения."""
-    category = serializers.SlugRelatedField(
+    category = CachedSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = CachedSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True
@@ -53,7 +69,7 @@ class TitleCreateUpdateSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'year', 'description', 'category', 'genre')
 
     def to_representation(self, instance):
-        return TitleReadSerializer(instance).data
+        return TitleReadSerializer(instance, context=self.context).data
 
 
 class SignUpSerializer(serializers.Serializer, UsernameValidationMixin):
@@ -0,0 +1,72 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import catalogue_changed
+
+from .authentication import get_token_version_key, user_cache
+from .cache import (CATALOGUE_NAMESPACE, bump_version, get_count_namespace,
+                    state_cache)
+from .slugs import slug_maps
+
+COUNTED_MODELS = (User, Category, Genre, Title, Review, Comment)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=Title.genre.through)
+@receiver(catalogue_changed)
+def invalidate_catalogue(sender, **kwargs):
+    """Сбрасывает кэш ответов каталога при любом изменении в нём."""
+    bump_version(CATALOGUE_NAMESPACE)
+
+
+def invalidate_counts(sender, **kwargs):
+    """Сбрасывает кэш количества объектов изменённой модели.
+
+    Количество произведений зависит и от связей с жанрами и категориями
+    (фильтры по slug), поэтому их изменения сбрасывают его тоже.
+    """
+    if sender in COUNTED_MODELS:
+        bump_version(get_count_namespace(sender))
+    if sender in (Category, Genre, Title.genre.through):
+        bump_version(get_count_namespace(Title))
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(invalidate_counts, sender=model)
+    post_delete.connect(invalidate_counts, sender=model)
+m2m_changed.connect(invalidate_counts, sender=Title.genre.through)
+
+
+@receiver(catalogue_changed)
+def invalidate_all_counts(sender, **kwargs):
+    """Сбрасывает кэш количеств после массовых изменений каталога."""
+    for model in COUNTED_MODELS:
+        bump_version(get_count_namespace(model))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(catalogue_changed)
+def invalidate_slugs(sender, **kwargs):
+    """Сбрасывает соответствие slug → id изменённой модели, а после
+    массовых изменений — всех моделей."""
+    models = (sender,) if sender in slug_maps else slug_maps
+    for model in models:
+        slug_maps[model].invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    """Сбрасывает закэшированные версию токенов и данные пользователя."""
+    state_cache.delete(get_token_version_key(instance.pk))
+    user_cache.delete(instance.pk)
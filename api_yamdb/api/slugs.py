@@ -0,0 +1,77 @@
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from reviews.models import Category, Genre
+
+from .cache import bump_version, get_version
+
+SLUG_MAP_FIELDS = ('id', 'name', 'slug')
+
+
+class SlugMap:
+    """Соответствие slug → (id, название) для небольшой модели в памяти
+    процесса.
+
+    Таблица загружается целиком одним запросом и перечитывается, когда
+    меняется версия в кэше, но не реже раза в SLUG_MAP_MAX_AGE секунд:
+    версию видят все процессы только при общем кэше (Redis, Memcached).
+    Slug, которого нет в соответствии, ищется в базе данных.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.namespace = f'slugs:{model._meta.label_lower}'
+        self.version = None
+        self.expires = 0
+        self.values = {}
+        self.lock = Lock()
+
+    def get_values(self):
+        version = get_version(self.namespace)
+        with self.lock:
+            if version != self.version or self.expires < monotonic():
+                self.values = {
+                    slug: (pk, name) for pk, name, slug in
+                    self.model.objects.values_list(*SLUG_MAP_FIELDS)
+                }
+                self.version = version
+                self.expires = monotonic() + settings.SLUG_MAP_MAX_AGE
+            return self.values
+
+    def get(self, slug):
+        """(id, название) по slug или None."""
+        values = self.get_values().get(slug)
+        if values is None:
+            # Объект мог появиться в другом процессе: соответствие
+            # перечитывается при следующем обращении.
+            values = self.model.objects.filter(slug=slug).values_list(
+                'id', 'name').first()
+            if values is not None:
+                with self.lock:
+                    self.version = None
+        return values
+
+    def get_id(self, slug):
+        values = self.get(slug)
+        return values[0] if values is not None else None
+
+    def get_object(self, slug):
+        """Объект модели, обычно без запроса к базе данных, или None."""
+        values = self.get(slug)
+        if values is None:
+            return None
+        return self.model.from_db(
+            DEFAULT_DB_ALIAS, SLUG_MAP_FIELDS, (*values, slug))
+
+    def invalidate(self):
+        """Сбрасывает соответствие сразу и ещё раз после фиксации
+        транзакции: до неё другие процессы могли прочитать старые данные."""
+        with self.lock:
+            self.version = None
+        bump_version(self.namespace)
+        transaction.on_commit(lambda: bump_version(self.namespace))
+
+
+slug_maps = {model: SlugMap(model) for model in (Category, Genre)}
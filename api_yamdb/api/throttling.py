@@ -0,0 +1,103 @@
+from hashlib import md5
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from rest_framework.throttling import SimpleRateThrottle
+
+from .cache import STATE_CACHE_ALIAS, LocalStore
+
+# Используется, если общий кэш недоступен или не хранит данные.
+local_store = LocalStore()
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов по скользящему окну.
+
+    Скорость задаётся в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] в формате
+    DRF ('10/min'): за любую минуту пропускается не больше 10 запросов.
+    Запросы считаются в счётчике текущего периода атомарными cache.add и
+    cache.incr, поэтому одновременные запросы не проходят сверх лимита;
+    счётчик предыдущего периода учитывается пропорционально тому, какая
+    его часть попадает в последнюю минуту.
+    """
+
+    def get_store(self):
+        store = caches[STATE_CACHE_ALIAS]
+        if isinstance(store, DummyCache):
+            return local_store
+        return store
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        window, elapsed = divmod(self.timer(), self.duration)
+        try:
+            return self.count_request(self.get_store(), window, elapsed)
+        except Exception:
+            return self.count_request(local_store, window, elapsed)
+
+    def count_request(self, store, window, elapsed):
+        key = f'{self.key}:{window:.0f}'
+        store.add(key, 0, 2 * self.duration)
+        count = store.incr(key)
+        previous = store.get(f'{self.key}:{window - 1:.0f}') or 0
+        if previous * (1 - elapsed / self.duration) + count <= (
+                self.num_requests):
+            return True
+        # Отклонённый запрос не расходует лимит.
+        store.decr(key)
+        self.wait_seconds = self.get_wait(previous, count - 1, elapsed)
+        return False
+
+    def get_wait(self, previous, count, elapsed):
+        """Секунды до момента, когда следующий запрос уложится в лимит."""
+        free = self.num_requests - 1
+        if count <= free:
+            return self.duration * (1 - (free - count) / previous) - elapsed
+        return self.duration * (2 - free / count) - elapsed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Ограничение по IP-адресу клиента."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class UsernameThrottle(SlidingWindowThrottle):
+    """Ограничение по username из тела запроса, независимо от IP."""
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if not username:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': md5(str(username).encode()).hexdigest(),
+        }
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup'
+
+
+class SignupUsernameThrottle(UsernameThrottle):
+    scope = 'signup_username'
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token'
+
+
+class TokenUsernameThrottle(UsernameThrottle):
+    scope = 'token_username'
@@ -1,22 +1,30 @@
 from random import choices
 
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db import IntegrityError
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters import rest_framework as django_filters
 from rest_framework import filters, mixins, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
-
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.outbox import enqueue_email
+from reviews.signals import catalogue_changed
+
+from .authentication import ClaimsAccessToken
+from .bulk import (bulk_create_with_ids, error_result, find_duplicates,
+                   get_bulk_items, get_lookup, validate_item)
+from .cache import (CachedListMixin, CachedRetrieveMixin, bump_version,
+                    get_count_namespace)
+from .conditional import ConditionalGetMixin
 from .filters import TitleFilter
+from .pagination import (CachedCountPageNumberPagination,
+                         PageNumberOrKeysetPagination)
 from .permissions import (IsAdmin, IsAdminOrReadOnly,
                           IsAuthorModeratorOrAdminOrReadOnly)
 from .serializers import (CategorySerializer, CommentSerializer,
@@ -24,15 +32,23 @@ from .serializers import (CategorySerializer, CommentSerializer,
                           ReviewSerializer, SignUpSerializer,
                           TitleCreateUpdateSerializer, TitleReadSerializer,
                           TokenSerializer, UserSerializer)
+from .signals import invalidate_user
+from .throttling import (SignupIPThrottle, SignupUsernameThrottle,
+                         TokenIPThrottle, TokenUsernameThrottle)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    CachedListMixin,
+    CachedRetrieveMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для произведений."""
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).order_by(*Title._meta.ordering)
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre')
     serializer_class = TitleReadSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = Title._meta.ordering
     filter_backends = (django_filters.DjangoFilterBackend,)
     filterset_class = TitleFilter
     http_method_names = ('get', 'post', 'patch', 'delete', 'head', 'options')
@@ -47,8 +63,100 @@ class TitleViewSet(viewsets.ModelViewSet):
         """Создание нового произведения."""
         serializer.save()
 
+    @action(
+        detail=False,
+        methods=('post', 'patch'),
+        url_path=settings.BULK_URL_SEGMENT,
+    )
+    def bulk(self, request):
+        """Создаёт или изменяет произведения списком.
+
+        Slug категорий и жанров ищутся в соответствии slug → id процесса;
+        ошибки возвращаются для каждого элемента, не мешая сохранить
+        остальные.
+        """
+        items = get_bulk_items(request.data)
+        serializer = self.get_serializer(
+            many=True, partial=request.method == 'PATCH')
+        handler = (
+            self.create_many if request.method == 'POST'
+            else self.update_many
+        )
+        try:
+            with transaction.atomic():
+                results = handler(serializer.child, items)
+        except IntegrityError:
+            raise ValidationError({'detail': (
+                'Данные конфликтуют с существующими произведениями.')})
+        catalogue_changed.send(sender=Title)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def create_many(self, child, items):
+        """Создаёт корректные произведения одним пакетом."""
+        results, titles, genres = {}, {}, {}
+        for index, item in enumerate(items):
+            try:
+                data = validate_item(child, item)
+            except ValidationError as error:
+                results[index] = error_result(error.detail)
+                continue
+            genres[index] = data.pop('genre')
+            titles[index] = Title(**data)
+        bulk_create_with_ids(Title, list(titles.values()))
+        self.set_genres(titles, genres)
+        for index, title in titles.items():
+            results[index] = {'status': status.HTTP_201_CREATED,
+                              'id': title.id}
+        return [results[index] for index in range(len(items))]
+
+    def update_many(self, child, items):
+        """Изменяет произведения, найденные по id."""
+        titles = Title.objects.in_bulk({
+            item.get('id') for item in items if isinstance(item, dict)
+            and isinstance(item.get('id'), int)
+        })
+        results, updated, genres, fields = {}, {}, {}, {'updated_at'}
+        for index, item in enumerate(items):
+            title = titles.pop(item.get('id'), None) if isinstance(
+                item, dict) and isinstance(item.get('id'), int) else None
+            if title is None:
+                results[index] = error_result(
+                    {'id': ['Произведение не найдено или повторяется в '
+                            'запросе.']},
+                    status.HTTP_404_NOT_FOUND)
+                continue
+            try:
+                data = validate_item(child, item, title)
+            except ValidationError as error:
+                results[index] = error_result(error.detail)
+                continue
+            if 'genre' in data:
+                genres[index] = data.pop('genre')
+            for field, value in data.items():
+                setattr(title, field, value)
+            fields.update(data)
+            title.updated_at = timezone.now()
+            updated[index] = title
+            results[index] = {'status': status.HTTP_200_OK, 'id': title.id}
+        Title.objects.bulk_update(
+            updated.values(), fields, batch_size=settings.BULK_BATCH_SIZE)
+        Title.genre.through.objects.filter(
+            title_id__in=[updated[index].id for index in genres]).delete()
+        self.set_genres(updated, genres)
+        return [results[index] for index in range(len(items))]
+
+    def set_genres(self, titles, genres):
+        """Добавляет жанры произведений пакетами в таблицу связей."""
+        through = Title.genre.through
+        through.objects.bulk_create((
+            through(title_id=titles[index].id, genre_id=genre_id)
+            for index, title_genres in genres.items()
+            for genre_id in {genre.id for genre in title_genres}
+        ), batch_size=settings.BULK_BATCH_SIZE)
+
 
 class BaseSlugViewSet(
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -75,39 +183,38 @@ class GenreViewSet(BaseSlugViewSet):
 
 @api_view(['POST'])
 @permission_classes((AllowAny,))
+@throttle_classes((SignupIPThrottle, SignupUsernameThrottle))
 def signup(request):
     """Регистрирует нового пользователя и
     отправляет проверочный код на email."""
     serializer = SignUpSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    try:
-        user, _ = User.objects.get_or_create(**serializer.validated_data)
-    except IntegrityError:
-        raise ValidationError(
-            {'email': 'email уже занят.'}
-            if User.objects.filter(
-                email=serializer.validated_data['email']).exists()
-            else {'username': 'username уже занят.'}
-        )
-
+    username = serializer.validated_data['username']
+    email = serializer.validated_data['email']
     confirmation_code = ''.join(choices(
         settings.CONFIRMATION_CODE_CHARS,
         k=settings.CONFIRMATION_CODE_LENGTH))
-    user.confirmation_code = confirmation_code
-    user.save(update_fields=['confirmation_code'])
-
-    send_mail(
-        subject='Код подтверждения YaMDb',
-        message=f'Ваш код подтверждения: {confirmation_code}',
-        recipient_list=(user.email,),
-        from_email=None,
-        fail_silently=False,
-    )
+    try:
+        with transaction.atomic():
+            if not User.objects.upsert_confirmation_code(
+                    username, email, confirmation_code):
+                raise ValidationError({'username': 'username уже занят.'})
+            # Письмо отправляется в фоне после фиксации транзакции.
+            enqueue_email(
+                recipient=email,
+                subject='Код подтверждения YaMDb',
+                message=f'Ваш код подтверждения: {confirmation_code}',
+            )
+    except IntegrityError:
+        raise ValidationError({'email': 'email уже занят.'})
+    # Новый пользователь мог быть создан в обход сигналов.
+    bump_version(get_count_namespace(User))
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes((AllowAny,))
+@throttle_classes((TokenIPThrottle, TokenUsernameThrottle))
 def token(request):
     """Выдаёт JWT-токен после проверки электронной почты."""
     serializer = TokenSerializer(data=request.data)
@@ -123,7 +230,7 @@ def token(request):
         user.confirmation_code = settings.BLOCKED_PIN
         user.save(update_fields=['confirmation_code'])
     return Response(
-        {'token': str(AccessToken.for_user(user))},
+        {'token': str(ClaimsAccessToken.for_user(user))},
         status=status.HTTP_200_OK,
     )
 
@@ -133,7 +240,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     lookup_field = 'username'
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPageNumberPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
     http_method_names = ('get', 'post', 'patch', 'delete')
@@ -148,7 +255,8 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def current_user(self, request):
         """Обрабатывает запросы к профилю текущего пользователя."""
-        user = request.user
+        # request.user собран из данных токена, профиль нужен целиком.
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method != 'PATCH':
             return Response(
                 UserSerializer(user).data,
@@ -160,34 +268,163 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(
+        detail=False,
+        methods=('post', 'patch', 'delete'),
+        url_path=settings.BULK_URL_SEGMENT,
+    )
+    def bulk(self, request):
+        """Создаёт, изменяет или удаляет пользователей списком.
+
+        Результат возвращается для каждого элемента в порядке запроса.
+        """
+        items = get_bulk_items(request.data)
+        handler = {
+            'POST': self.create_many,
+            'PATCH': self.update_many,
+            'DELETE': self.delete_many,
+        }[request.method]
+        try:
+            with transaction.atomic():
+                results = handler(items)
+        except IntegrityError:
+            raise ValidationError({'detail': (
+                'Данные конфликтуют с существующими пользователями.')})
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def create_many(self, items):
+        child = self.get_serializer(many=True).child
+        results, valid = {}, {}
+        for index, item in enumerate(items):
+            try:
+                valid[index] = validate_item(child, item)
+            except ValidationError as error:
+                results[index] = error_result(error.detail)
+        for field in ('username', 'email'):
+            for index in find_duplicates(valid, field):
+                results[index] = error_result(
+                    {field: ['Значение повторяется в запросе.']})
+        users = {
+            index: User(**data) for index, data in valid.items()
+            if index not in results
+        }
+        User.objects.bulk_create(users.values())
+        bump_version(get_count_namespace(User))
+        for index, user in users.items():
+            results[index] = {
+                'status': status.HTTP_201_CREATED,
+                'data': child.to_representation(user),
+            }
+        return [results[index] for index in range(len(items))]
+
+    def update_many(self, items):
+        """Изменяет пользователей, найденных по username; сам username
+        списком не меняется."""
+        child = self.get_serializer(many=True, partial=True).child
+        users = User.objects.in_bulk(
+            {get_lookup(item, 'username') for item in items} - {None},
+            field_name='username',
+        )
+        results, updated, fields = {}, {}, set()
+        for index, item in enumerate(items):
+            user = users.pop(get_lookup(item, 'username'), None)
+            if user is None:
+                results[index] = error_result(
+                    {'username': [
+                        'Пользователь не найден или повторяется в запросе.']},
+                    status.HTTP_404_NOT_FOUND)
+                continue
+            try:
+                data = validate_item(child, item, user)
+            except ValidationError as error:
+                results[index] = error_result(error.detail)
+                continue
+            for field, value in data.items():
+                setattr(user, field, value)
+            fields.update(data)
+            updated[index] = user
+        self.save_many(updated.values(), fields)
+        for index, user in updated.items():
+            results[index] = {
+                'status': status.HTTP_200_OK,
+                'data': child.to_representation(user),
+            }
+        return [results[index] for index in range(len(items))]
+
+    def save_many(self, users, fields):
+        """Сохраняет изменённых пользователей одним bulk_update, сам
+        увеличивая версию токенов, как это делает User.save()."""
+        for user in users:
+            if user.get_token_state() != user._token_state:
+                user.token_version += 1
+                fields.add('token_version')
+        fields.discard('username')
+        if fields:
+            User.objects.bulk_update(users, fields)
+        for user in users:
+            # bulk_update не отправляет сигналы post_save.
+            invalidate_user(User, user)
+            user.remember_token_state()
+
+    def delete_many(self, items):
+        """Удаляет пользователей по списку username."""
+        usernames = [get_lookup(item, 'username') for item in items]
+        users = User.objects.in_bulk(
+            set(usernames) - {None},
+            field_name='username',
+        )
+        User.objects.filter(
+            pk__in=[user.pk for user in users.values()]).delete()
+        return [
+            {'status': status.HTTP_204_NO_CONTENT}
+            if users.pop(username, None)
+            else error_result(
+                {'username': ['Пользователь не найден.']},
+                status.HTTP_404_NOT_FOUND)
+            for username in usernames
+        ]
+
+
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для отзывов."""
 
     http_method_names = ('get', 'post', 'patch', 'delete')
     serializer_class = ReviewSerializer
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-pub_date', '-id')
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorModeratorOrAdminOrReadOnly,
     )
 
     def get_title(self):
-        """Получает объект Title по title_id из URL."""
-        return get_object_or_404(Title, id=self.kwargs['title_id'])
+        """Получает объект Title по title_id из URL один раз за запрос."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(Title, id=self.kwargs['title_id'])
+        return self._title
 
     def get_queryset(self):
-        """Возвращает queryset с отзывами для конкретного title."""
-        return self.get_title().reviews.all()
+        """Возвращает queryset с отзывами для конкретного title.
+
+        Существование произведения проверяется отдельно только для списка:
+        отзыв по id ищется сразу с условием на title_id.
+        """
+        if self.action == 'list':
+            self.get_title()
+        return Review.objects.filter(
+            title_id=self.kwargs['title_id']).select_related('author')
 
     def perform_create(self, serializer):
         """Создает отзыв для конкретного title."""
         serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Вьюсет для комментариев."""
 
     serializer_class = CommentSerializer
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-pub_date', '-id')
     permission_classes = (
         IsAuthenticatedOrReadOnly,
         IsAuthorModeratorOrAdminOrReadOnly,
@@ -195,12 +432,24 @@ class CommentViewSet(viewsets.ModelViewSet):
     http_method_names = ('get', 'post', 'patch', 'delete')
 
     def get_review(self):
-        """Получает объект Review по review_id из URL."""
-        return get_object_or_404(Review, id=self.kwargs['review_id'])
+        """Получает объект Review по review_id и title_id из URL
+        один раз за запрос."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs['review_id'],
+                title_id=self.kwargs['title_id'],
+            )
+        return self._review
 
     def get_queryset(self):
         """Возвращает queryset с комментариями для конкретного review."""
-        return self.get_review().comments.all()
+        if self.action == 'list':
+            self.get_review()
+        return Comment.objects.filter(
+            review_id=self.kwargs['review_id'],
+            review__title_id=self.kwargs['title_id'],
+        ).select_related('author')
 
     def perform_create(self, serializer):
         """Создает комментарий для конкретного review."""
@@ -73,6 +73,36 @@ DATABASES = {
 }
 
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'yamdb'),
+    },
+    # Счётчики ограничения частоты запросов и версии пространств ключей
+    # хранятся отдельно, чтобы их не вытесняли записи кэша ответов.
+    'state': {
+        'BACKEND': os.getenv(
+            'STATE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('STATE_CACHE_LOCATION', 'yamdb-state'),
+    },
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+# Только для PostgreSQL: выше этого порога count берётся из плана запроса.
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000))
+# Соответствие slug → id категорий и жанров перечитывается при смене версии
+# в кэше и не реже раза в столько секунд: с кэшем в памяти процесса
+# (LocMemCache) другие процессы узнают об изменениях только так.
+SLUG_MAP_MAX_AGE = int(os.getenv('SLUG_MAP_MAX_AGE', 60))
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -112,22 +142,41 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': os.getenv('THROTTLE_SIGNUP', '30/min'),
+        'signup_username': os.getenv('THROTTLE_SIGNUP_USERNAME', '5/min'),
+        'token': os.getenv('THROTTLE_TOKEN', '30/min'),
+        'token_username': os.getenv('THROTTLE_TOKEN_USERNAME', '10/min'),
+    },
+    # Число прокси перед приложением: только их адреса в X-Forwarded-For
+    # считаются достоверными. При 0 IP-адрес клиента берётся из REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# Сколько секунд версия токенов пользователя хранится в кэше: столько
+# отозванный токен может действовать в процессах с отдельным кэшем.
+TOKEN_VERSION_CACHE_TIMEOUT = int(
+    os.getenv('TOKEN_VERSION_CACHE_TIMEOUT', 60))
+# Кэш ролей пользователей в памяти процесса для токенов без данных о них.
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1000))
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', 60))
 
 AUTH_USER_MODEL = 'reviews.User'
 PROFILE_URL_SEGMENT = 'me'
+BULK_URL_SEGMENT = 'bulk'
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 1000))
+BULK_BATCH_SIZE = 1000
 
 CONFIRMATION_CODE_CHARS = '0123456789'
 CONFIRMATION_CODE_LENGTH = 6
@@ -136,3 +185,15 @@ BLOCKED_PIN = 'x' * CONFIRMATION_CODE_LENGTH
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 DEFAULT_FROM_EMAIL = 'noreply@yamdb.com'
+
+# Очередь писем: при OUTBOX_ASYNC письма отправляются фоновыми потоками,
+# которые также каждые OUTBOX_POLL_INTERVAL секунд повторяют неудачные
+# отправки (OUTBOX_WORKERS = 0 — только командой send_outbox), иначе сразу
+# после фиксации транзакции в том же потоке.
+OUTBOX_ASYNC = os.getenv('OUTBOX_ASYNC', 'True') == 'True'
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 2))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', 30))
+OUTBOX_MAX_RETRY_DELAY = int(os.getenv('OUTBOX_MAX_RETRY_DELAY', 3600))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 30))
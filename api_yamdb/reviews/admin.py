@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, Comment, Genre, OutgoingEmail, Review, Title,
+                     User)
 
 
 @admin.register(Category, Genre)
@@ -16,6 +17,7 @@ class TitleAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'year', 'category')
     search_fields = ('name',)
     list_filter = ('year', 'category')
+    readonly_fields = ('rating_sum', 'rating_count')
 
 
 @admin.register(Review)
@@ -32,6 +34,14 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
 
 
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient', 'subject', 'created_at', 'attempts',
+                    'sent_at')
+    search_fields = ('recipient',)
+    list_filter = ('sent_at',)
+
+
 UserAdmin.fieldsets += (('О пользователе', {'fields': ('bio', 'role')}),)
 
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from reviews.models import Comment, Review, Title, User
+
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замер запросов списков с индексами и без них на '
+            'сгенерированных данных (изменения откатываются)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--titles', type=int, default=5000)
+        parser.add_argument('--reviews-per-title', type=int, default=10)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self.seed(options)
+                with_indexes = self.measure()
+                self.drop_indexes()
+                without_indexes = self.measure()
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(
+            f'{"запрос":<28}{"без индексов, мс":>18}{"с индексами, мс":>18}')
+        for name, timing in with_indexes.items():
+            self.stdout.write(
+                f'{name:<28}{without_indexes[name]:>18.3f}{timing:>18.3f}')
+
+    def seed(self, options):
+        """Генерирует данные: одно популярное произведение с отзывом
+        от каждого пользователя и один популярный отзыв с комментариями."""
+        def next_id(model):
+            return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+        now = timezone.now()
+        user_id, title_id = next_id(User), next_id(Title)
+        review_id, comment_id = next_id(Review), next_id(Comment)
+        users = range(user_id, user_id + options['users'])
+        titles = range(title_id, title_id + options['titles'])
+        User.objects.bulk_create((
+            User(id=pk, username=f'bench_{pk}', email=f'bench_{pk}@bench.fake')
+            for pk in users
+        ), batch_size=BATCH_SIZE)
+        Title.objects.bulk_create((
+            Title(id=pk, name=f'Произведение {pk % 997}', year=1900 + pk % 120)
+            for pk in titles
+        ), batch_size=BATCH_SIZE)
+        reviews = [(titles[0], author) for author in users]
+        reviews += [
+            (title, author)
+            for title in titles[1:]
+            for author in users[:options['reviews_per_title']]
+        ]
+        reviews = [
+            Review(id=review_id + number, title_id=title, author_id=author,
+                   text='Отзыв', score=1 + number % 10)
+            for number, (title, author) in enumerate(reviews)
+        ]
+        comments = [
+            Comment(id=comment_id + number, review_id=review_id,
+                    author_id=users[number % len(users)], text='Комментарий')
+            for number in range(options['comments'])
+        ]
+        for model, objects in ((Review, reviews), (Comment, comments)):
+            model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+            # bulk_create заполняет pub_date (auto_now_add) текущим временем,
+            # поэтому разброс дат записывается отдельно.
+            for number, obj in enumerate(objects):
+                obj.pub_date = now - timedelta(seconds=number // 3)
+            model.objects.bulk_update(
+                objects, ('pub_date',), batch_size=BATCH_SIZE)
+        self.popular_title_id = titles[0]
+        self.popular_review_id = review_id
+
+    def get_queries(self):
+        return {
+            'titles: первая страница': Title.objects.order_by(
+                '-year', 'name', 'id'),
+            'titles: year=1950': Title.objects.filter(year=1950).order_by(
+                '-year', 'name', 'id'),
+            'reviews: популярное': Review.objects.filter(
+                title_id=self.popular_title_id).order_by('-pub_date', '-id'),
+            'comments: популярный отзыв': Comment.objects.filter(
+                review_id=self.popular_review_id).order_by(
+                    '-pub_date', '-id'),
+        }
+
+    def measure(self):
+        timings = {}
+        for name, queryset in self.get_queries().items():
+            samples = []
+            for _ in range(self.repeat):
+                started = perf_counter()
+                list(queryset[:10])
+                samples.append((perf_counter() - started) * 1000)
+            timings[name] = median(samples)
+        return timings
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in (Title, Review, Comment):
+                for index in model._meta.indexes:
+                    cursor.execute(
+                        f'DROP INDEX {connection.ops.quote_name(index.name)}')
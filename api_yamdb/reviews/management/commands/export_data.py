@@ -0,0 +1,94 @@
+import csv
+import gzip
+import io
+import json
+import os
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .import_csv import CSV_FILES, get_attname
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+COMPRESSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def to_json(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def open_output(path, compression):
+    """Открывает текстовый поток для записи с нужным сжатием."""
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    if compression == 'zstd':
+        return io.TextIOWrapper(
+            zstandard.ZstdCompressor().stream_writer(open(path, 'wb')),
+            encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+class Command(BaseCommand):
+    help = ('Экспорт данных в CSV или NDJSON в формате, '
+            'который принимает import_csv')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', type=str, default='export')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--compress', choices=tuple(COMPRESSIONS), default='none')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['compress'] == 'zstd' and zstandard is None:
+            raise CommandError(
+                'Для сжатия zstd установите пакет zstandard.')
+        self.chunk_size = options['chunk_size']
+        os.makedirs(options['path'], exist_ok=True)
+        self.stdout.write(f'Экспорт данных в {options["path"]}')
+        for spec in CSV_FILES:
+            name = os.path.splitext(spec.file_name)[0]
+            path = os.path.join(
+                options['path'],
+                f'{name}.{options["format"]}'
+                f'{COMPRESSIONS[options["compress"]]}')
+            started = perf_counter()
+            with open_output(path, options['compress']) as file:
+                rows = self.export_data(file, spec, options['format'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{spec.model.__name__} экспортированы: {rows} строк за '
+                f'{perf_counter() - started:.2f} с'))
+        self.stdout.write(self.style.SUCCESS('Экспорт данных завершен'))
+
+    def get_rows(self, model, attnames):
+        """Строки таблицы по возрастанию id без загрузки всей таблицы."""
+        return model.objects.order_by('id').values_list(
+            *attnames).iterator(chunk_size=self.chunk_size)
+
+    def export_data(self, file, spec, output_format):
+        attnames = [
+            get_attname(field) if field in spec.foreign_keys else field
+            for field in spec.fields
+        ]
+        rows = self.get_rows(spec.model, attnames)
+        count = 0
+        if output_format == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(spec.fields)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(
+                    dict(zip(spec.fields, row)),
+                    ensure_ascii=False, default=to_json))
+                file.write('\n')
+                count += 1
+        return count
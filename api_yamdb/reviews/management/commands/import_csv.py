@@ -1,12 +1,321 @@
 import csv
+import io
+import json
+import mmap
 import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from itertools import islice
+from multiprocessing import get_all_start_methods, get_context
+from time import perf_counter
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db.utils import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import (DEFAULT_DB_ALIAS, IntegrityError, connection,
+                       connections, transaction)
+from django.utils import timezone
 from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.signals import catalogue_changed
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 DATA_PATH = os.path.join(settings.BASE_DIR, 'static', 'data')
+BATCH_SIZE = 1000
+CHECKPOINT_DIR_NAME = '.import_checkpoints'
+# Для таблиц больше этого размера существование внешних ключей проверяется
+# запросом на каждый пакет, а не множеством всех id в памяти.
+ID_CACHE_LIMIT = 1_000_000
+
+CsvSpec = namedtuple('CsvSpec', 'model file_name fields foreign_keys')
+
+CSV_FILES = (
+    CsvSpec(
+        User, 'users.csv',
+        ['id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'],
+        {},
+    ),
+    CsvSpec(Category, 'category.csv', ['id', 'name', 'slug'], {}),
+    CsvSpec(Genre, 'genre.csv', ['id', 'name', 'slug'], {}),
+    CsvSpec(
+        Title, 'titles.csv',
+        ['id', 'name', 'year', 'description', 'category'],
+        {'category': Category},
+    ),
+    CsvSpec(
+        Review, 'review.csv',
+        ['id', 'title_id', 'text', 'author', 'score', 'pub_date'],
+        {'author': User, 'title_id': Title},
+    ),
+    CsvSpec(
+        Comment, 'comments.csv',
+        ['id', 'review_id', 'text', 'author', 'pub_date'],
+        {'author': User, 'review_id': Review},
+    ),
+    CsvSpec(
+        Title.genre.through, 'genre_title.csv',
+        ['id', 'title_id', 'genre_id'],
+        {'title_id': Title, 'genre_id': Genre},
+    ),
+)
+INTEGER_FIELDS = ('id', 'score', 'year')
+
+
+def get_stages(specs=CSV_FILES):
+    """Разбивает файлы на этапы по зависимостям внешних ключей.
+
+    Файлы одного этапа не ссылаются друг на друга и могут импортироваться
+    одновременно; каждый этап начинается после завершения предыдущего.
+    """
+    levels = {}
+    for spec in specs:
+        levels[spec.model] = 1 + max(
+            (levels.get(model, 0) for model in spec.foreign_keys.values()),
+            default=0,
+        )
+    stages = [[] for _ in range(max(levels.values(), default=0))]
+    for spec in specs:
+        stages[levels[spec.model] - 1].append(spec)
+    return stages
+
+
+class CsvReader:
+    """Читает CSV из бинарного файла, сообщая смещение после каждой строки.
+
+    Смещение — позиция в байтах сразу за последней прочитанной записью
+    (с учётом многострочных полей), с него можно продолжить чтение.
+    С use_mmap файл читается через отображение в память с подсказкой
+    ядру о последовательном чтении; в памяти процесса хранится только
+    текущая строка.
+    """
+
+    def __init__(self, file, offset=0, use_mmap=False):
+        self.file = file
+        if use_mmap and os.fstat(file.fileno()).st_size:
+            self.file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.file.madvise(mmap.MADV_SEQUENTIAL)
+        self.header = next(csv.reader(
+            [self.file.readline().decode('utf-8-sig')]))
+        if offset:
+            self.file.seek(offset)
+        self.offset = self.file.tell()
+
+    def lines(self):
+        for line in iter(self.file.readline, b''):
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self):
+        for row in csv.reader(self.lines()):
+            if row:
+                yield dict(zip(self.header, row)), self.offset
+
+    def close(self):
+        if isinstance(self.file, mmap.mmap):
+            self.file.close()
+
+
+class Checkpoint:
+    """Прогресс импорта одного файла: смещение, число строк, завершённость.
+
+    Сохраняется после каждого зафиксированного пакета. Если размер или
+    время изменения CSV-файла отличаются от записанных, прогресс
+    считается недействительным и файл импортируется с начала.
+    """
+
+    def __init__(self, directory, file_path):
+        self.path = os.path.join(
+            directory, f'{os.path.basename(file_path)}.json')
+        stat = os.stat(file_path)
+        self.signature = [stat.st_size, stat.st_mtime_ns]
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if state.get('signature') != self.signature:
+            return None
+        return state
+
+    def save(self, offset, rows, done=False):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'signature': self.signature,
+                'offset': offset,
+                'rows': rows,
+                'done': done,
+            }, file)
+        os.replace(temporary_path, self.path)
+
+
+class FastLoader:
+    """Вставка строк в таблицу модели без создания объектов модели.
+
+    На SQLite используется executemany с INSERT OR IGNORE, на PostgreSQL —
+    COPY во временную таблицу и INSERT ... ON CONFLICT DO NOTHING.
+    Незаполненные поля получают значения по умолчанию, поля auto_now и
+    auto_now_add — время начала пакета.
+    """
+
+    VENDORS = ('sqlite', 'postgresql')
+    # Значения этих полей передаются в базу как есть, без преобразования.
+    PLAIN_TYPES = (
+        'AutoField', 'BigAutoField', 'CharField', 'EmailField', 'ForeignKey',
+        'IntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+        'SlugField', 'SmallIntegerField', 'TextField',
+    )
+
+    def __init__(self, model):
+        self.model = model
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.fields = model._meta.concrete_fields
+        self.plain = {
+            field.attname for field in self.fields
+            if field.get_internal_type() in self.PLAIN_TYPES
+        }
+        quote_name = self.connection.ops.quote_name
+        self.table = quote_name(model._meta.db_table)
+        self.columns = ', '.join(
+            quote_name(field.column) for field in self.fields)
+
+    def get_defaults(self, now):
+        """Значения незаполненных полей, вычисляемые один раз на пакет."""
+        defaults = {}
+        for field in self.fields:
+            if getattr(field, 'auto_now', False) or getattr(
+                    field, 'auto_now_add', False):
+                value = now
+            else:
+                value = field.get_default()
+            defaults[field.attname] = field.get_db_prep_save(
+                value, self.connection)
+        return defaults
+
+    def prepare(self, data, defaults):
+        values = []
+        for field in self.fields:
+            name = field.attname
+            if name not in data:
+                values.append(defaults[name])
+            elif name in self.plain:
+                values.append(data[name])
+            else:
+                values.append(
+                    field.get_db_prep_save(data[name], self.connection))
+        return values
+
+    def insert(self, rows):
+        """Вставляет строки и возвращает число вставленных: остальные
+        пропущены из-за повторяющихся id или нарушения ограничений."""
+        if not rows:
+            return 0
+        defaults = self.get_defaults(timezone.now())
+        rows = [self.prepare(data, defaults) for data in rows]
+        if self.connection.vendor == 'postgresql':
+            return self.copy(rows)
+        placeholders = ', '.join(['%s'] * len(self.fields))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR IGNORE INTO {self.table} ({self.columns}) '
+                f'VALUES ({placeholders})', rows)
+            return cursor.rowcount
+
+    def copy(self, rows):
+        temporary = self.connection.ops.quote_name(
+            f'import_{self.model._meta.db_table}')
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {temporary} '
+                f'(LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DROP')
+            cursor.copy_expert(
+                f'COPY {temporary} ({self.columns}) FROM STDIN '
+                'WITH (FORMAT csv)',
+                io.StringIO(''.join(map(to_csv_line, rows))))
+            cursor.execute(
+                f'INSERT INTO {self.table} ({self.columns}) '
+                f'SELECT {self.columns} FROM {temporary} '
+                'ON CONFLICT DO NOTHING')
+            return cursor.rowcount
+
+
+def to_csv_line(values):
+    """Строка для COPY: NULL — пустое поле без кавычек, строки в кавычках."""
+    return ','.join(
+        '' if value is None else '"{}"'.format(str(value).replace('"', '""'))
+        for value in values
+    ) + '\n'
+
+
+@contextmanager
+def sqlite_tuning():
+    """Отключает синхронную запись и журнал на диске на время загрузки.
+
+    Настройки меняются только вне транзакции и восстанавливаются после.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA journal_mode = MEMORY')
+        cursor.execute('PRAGMA synchronous = OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+            cursor.execute(f'PRAGMA synchronous = {synchronous}')
+
+
+def import_in_worker(file_name, options):
+    """Импорт одного файла в отдельном процессе со своим соединением."""
+    command = Command()
+    command.setup(options)
+    spec = next(spec for spec in CSV_FILES if spec.file_name == file_name)
+    return command.import_data(*spec)
+
+
+def get_peak_rss():
+    """Пиковый RSS процесса в мегабайтах или None, если он недоступен."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_attname(field):
+    """Имя колонки внешнего ключа: author -> author_id."""
+    return field if field.endswith('_id') else f'{field}_id'
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
@@ -14,124 +323,223 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str, default=DATA_PATH)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов для одновременного импорта независимых '
+                 'файлов (пользователи, категории, жанры и т.д.).')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванный импорт с последнего сохранённого '
+                 'пакета, пропуская уже импортированные файлы.')
+        parser.add_argument(
+            '--checkpoint-dir', type=str, default=None,
+            help='Каталог файлов прогресса (по умолчанию '
+                 f'<path>/{CHECKPOINT_DIR_NAME}).')
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Загружать строки напрямую в таблицы (executemany на '
+                 'SQLite, COPY на PostgreSQL) без создания объектов '
+                 'моделей. Значения pub_date из CSV сохраняются.')
+        parser.add_argument(
+            '--mmap', action='store_true',
+            help='Читать CSV через отображение файла в память.')
+
+    def setup(self, options):
+        self.path = options['path']
+        self.batch_size = options['batch_size']
+        self.resume = options['resume']
+        self.fast = options['fast']
+        self.use_mmap = options['mmap']
+        self.checkpoint_dir = options['checkpoint_dir'] or os.path.join(
+            self.path, CHECKPOINT_DIR_NAME)
+        self.known_ids = {}
+        self.batch_ids = {}
 
     def handle(self, *args, **options):
-        path = options['path']
-        self.stdout.write(f'Импорт данных из {path}')
+        self.setup(options)
+        if self.fast and connection.vendor not in FastLoader.VENDORS:
+            raise CommandError(
+                '--fast поддерживается только для SQLite и PostgreSQL.')
+        workers = self.get_workers(options['workers'])
+        self.stdout.write(f'Импорт данных из {self.path}')
 
-        self.import_data(
-            User, 'users.csv',
-            ['id', 'username', 'email', 'role',
-             'bio', 'first_name', 'last_name']
-        )
-        self.import_data(
-            Category, 'category.csv',
-            ['id', 'name', 'slug']
-        )
-        self.import_data(
-            Genre, 'genre.csv',
-            ['id', 'name', 'slug']
-        )
-        self.import_data(
-            Title, 'titles.csv',
-            ['id', 'name', 'year', 'description', 'category'],
-            foreign_keys={'category': (Category, 'id')}
-        )
-        self.import_data(
-            Review, 'review.csv',
-            ['id', 'title_id', 'text', 'author', 'score', 'pub_date'],
-            foreign_keys={'author': (User, 'id'), 'title_id': (Title, 'id')}
-        )
-        self.import_data(
-            Comment, 'comments.csv',
-            ['id', 'review_id', 'text', 'author', 'pub_date'],
-            foreign_keys={'author': (User, 'id'), 'review_id': (Review, 'id')}
-        )
-        self.import_genre_title('genre_title.csv')
+        for number, stage in enumerate(get_stages(), 1):
+            started = perf_counter()
+            if workers > 1 and len(stage) > 1:
+                self.import_parallel(stage, workers, options)
+            else:
+                for spec in stage:
+                    self.import_data(*spec)
+            self.stdout.write(
+                f'Этап {number} '
+                f'({", ".join(spec.file_name for spec in stage)}): '
+                f'{perf_counter() - started:.2f} с')
+        self.reset_sequences()
+        if self.fast:
+            self.check_integrity()
+        Title.objects.recalculate_ratings()
+        catalogue_changed.send(sender=Title)
 
         self.stdout.write(self.style.SUCCESS('Импорт данных завершен'))
 
+    def get_workers(self, workers):
+        if workers <= 1:
+            return 1
+        if 'fork' not in get_all_start_methods():
+            raise CommandError(
+                '--workers поддерживается только на платформах с fork().')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.stdout.write(self.style.WARNING(
+                'База данных в памяти недоступна другим процессам, '
+                'импорт выполняется последовательно.'))
+            return 1
+        return workers
+
+    def import_parallel(self, stage, workers, options):
+        # Дочерние процессы не должны использовать соединение родителя.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(stage)),
+            mp_context=get_context('fork'),
+        ) as pool:
+            futures = [
+                pool.submit(import_in_worker, spec.file_name, options)
+                for spec in stage
+            ]
+            for future in futures:
+                future.result()
+        self.known_ids.clear()
+
+    def reset_sequences(self):
+        """Сдвигает последовательности id за импортированные значения."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [spec.model for spec in CSV_FILES])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+    def check_integrity(self):
+        """Проверяет внешние ключи после загрузки в обход моделей."""
+        for spec in CSV_FILES:
+            table = spec.model._meta.db_table
+            try:
+                connection.check_constraints(table_names=[table])
+            except IntegrityError as error:
+                raise CommandError(
+                    f'Нарушена целостность данных в таблице {table}: '
+                    f'{error}. Загруженные данные уже сохранены: исправьте '
+                    'их или очистите таблицы и повторите импорт.')
+
     def open_csv_file(self, file_name):
-        file_path = os.path.join(DATA_PATH, file_name)
+        file_path = os.path.join(self.path, file_name)
         if not os.path.exists(file_path):
             self.stdout.write(self.style.WARNING(
                 f'Файл {file_name} не найден'))
             return
         try:
-            return open(file_path, encoding='utf-8')
+            return open(file_path, 'rb')
         except Exception as e:
             self.stdout.write(self.style.ERROR(
                 f'Ошибка при чтении {file_name}: {e}'))
             return
 
-    def process_row(self, row, fields, foreign_keys=None):
+    def cache_ids(self, model):
+        """Загружает множество id модели один раз за импорт, если таблица
+        не больше ID_CACHE_LIMIT строк. Возвращает, загружено ли оно."""
+        if model not in self.known_ids:
+            self.known_ids[model] = (
+                set(model.objects.values_list('id', flat=True))
+                if model.objects.count() <= ID_CACHE_LIMIT else None
+            )
+        return self.known_ids[model] is not None
+
+    def get_ids(self, model):
+        if self.cache_ids(model):
+            return self.known_ids[model]
+        return self.batch_ids[model]
+
+    def load_batch_ids(self, batch, foreign_keys):
+        """Находит id внешних ключей пакета в больших таблицах, чтобы память
+        не зависела от их размера."""
+        for field, model in foreign_keys.items():
+            if self.cache_ids(model):
+                continue
+            values = {to_int(row.get(field)) for row, _ in batch} - {None}
+            self.batch_ids[model] = set(model.objects.filter(
+                id__in=values).values_list('id', flat=True))
+
+    def process_row(self, model, row, fields, foreign_keys):
         try:
             data = {key: row[key] for key in fields if key in row}
-            if foreign_keys:
-                for field, (fk_model, fk_field) in foreign_keys.items():
-                    fk_value = row[field]
-                    fk_object = fk_model.objects.filter(
-                        **{fk_field: fk_value}).first()
-                    actual_field = (field[:- 3] if field.endswith('_id')
-                                    else field)
-                    data[actual_field] = fk_object
-                    if actual_field != field:
-                        data.pop(field, None)
-            if 'id' in data:
-                data['id'] = int(data['id'])
-            if 'score' in data:
-                data['score'] = int(data['score'])
-            if 'year' in data:
-                data['year'] = int(data['year'])
+            for key in INTEGER_FIELDS:
+                if key in data:
+                    data[key] = int(data[key])
+            for field, fk_model in foreign_keys.items():
+                value = data.pop(field, None)
+                value = int(value) if value else None
+                if value is not None and value not in self.get_ids(fk_model):
+                    if not model._meta.get_field(field).null:
+                        raise ValueError(
+                            f'{fk_model.__name__} с id={value} не найден')
+                    value = None
+                data[get_attname(field)] = value
             return data
-        except IntegrityError:
-            return
         except Exception as e:
             self.stdout.write(self.style.WARNING(f'Ошибка в строке: {e}'))
             return
 
-    def import_data(self, model, file_name, fields, foreign_keys=None):
+    def import_data(self, model, file_name, fields, foreign_keys):
         file = self.open_csv_file(file_name)
         if file is None:
-            return
-        with file:
-            reader = csv.DictReader(file)
-            objects = []
-            for row in reader:
-                data = self.process_row(row, fields, foreign_keys)
-                if data:
-                    objects.append(model(**data))
-            if objects:
-                model.objects.bulk_create(objects, ignore_conflicts=True)
-                self.stdout.write(self.style.SUCCESS(
-                    f'{model.__name__} импортированы'))
-
-    def import_genre_title(self, file_name):
-        file_path = os.path.join(DATA_PATH, file_name)
-        if not os.path.exists(file_path):
+            return 0
+        checkpoint = Checkpoint(self.checkpoint_dir, file.name)
+        state = checkpoint.load() if self.resume else None
+        if state and state['done']:
+            file.close()
+            self.stdout.write(f'{file_name} уже импортирован, пропуск')
+            return 0
+        offset, rows = (state['offset'], state['rows']) if state else (0, 0)
+        if offset:
+            self.stdout.write(
+                f'{file_name}: продолжение со строки {rows + 1}')
+        started = perf_counter()
+        imported = skipped = 0
+        loader = FastLoader(model) if self.fast else None
+        reader = CsvReader(file, offset, self.use_mmap)
+        tuning = sqlite_tuning() if self.fast else nullcontext()
+        with file, closing(reader), tuning:
+            for batch in batched(reader, self.batch_size):
+                self.load_batch_ids(batch, foreign_keys)
+                objects = []
+                for row, _ in batch:
+                    data = self.process_row(model, row, fields, foreign_keys)
+                    if data:
+                        objects.append(data if loader else model(**data))
+                with transaction.atomic():
+                    if loader:
+                        inserted = loader.insert(objects)
+                        skipped += len(objects) - inserted
+                    else:
+                        model.objects.bulk_create(
+                            objects, ignore_conflicts=True)
+                imported += len(objects)
+                rows += len(batch)
+                checkpoint.save(batch[-1][1], rows)
+            checkpoint.save(reader.offset, rows, done=True)
+        if skipped:
             self.stdout.write(self.style.WARNING(
-                f'Файл {file_name} не найден'))
-            return
-        try:
-            with open(file_path, encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                title_genres = []
-                for row in reader:
-                    try:
-                        title = Title.objects.filter(
-                            id=row['title_id']).first()
-                        genre = Genre.objects.filter(
-                            id=row['genre_id']).first()
-                        if title and genre:
-                            title_genres.append((title, genre))
-                    except Exception:
-                        continue
-
-            for title, genre in title_genres:
-                title.genre.add(genre)
-
-            self.stdout.write(self.style.SUCCESS(
-                'Связи произведений и жанров импортированы'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(
-                f'Ошибка при чтении {file_name}: {e}'))
+                f'{file_name}: {skipped} строк не вставлено (id уже есть в '
+                'таблице или нарушены ограничения)'))
+        self.report(model.__name__, imported - skipped,
+                    perf_counter() - started)
+        return imported - skipped
+
+    def report(self, name, rows, seconds):
+        rate = rows / seconds if seconds else rows
+        peak_rss = get_peak_rss()
+        memory = f', пик RSS {peak_rss:.0f} МБ' if peak_rss else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{name} импортированы: {rows} строк за {seconds:.2f} с '
+            f'({rate:.0f} строк/с{memory})'))
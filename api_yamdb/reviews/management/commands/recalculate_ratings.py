@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from reviews.models import Title
+from reviews.signals import catalogue_changed
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтингов произведений по отзывам'
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_ratings()
+        catalogue_changed.send(sender=Title)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги пересчитаны: {updated}'))
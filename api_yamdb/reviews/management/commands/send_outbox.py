@@ -0,0 +1,36 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from reviews.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с.')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.send_all(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Отправлено писем: {sent}, не удалось отправить: '
+                    f'{failed}'))
+            if not options['loop']:
+                return
+            sleep(options['interval'])
+
+    def send_all(self, batch_size):
+        """Отправляет пакеты, пока в очереди есть готовые письма."""
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending(batch_size)
+            if not sent and not failed:
+                return total_sent, total_failed
+            total_sent += sent
+            total_failed += failed
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_user_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Увеличивается при изменении данных, записанных в токен; токены с прежней версией перестают действовать.', verbose_name='Версия токенов'),
+        ),
+    ]
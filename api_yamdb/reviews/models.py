@@ -1,7 +1,11 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as BaseUserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from .constants import (EMAIL_MAX_LENGTH, MAX_LENGTH_NAME, MAX_LENGTH_SLUG,
                         MAX_LENGTH_STR, MAX_SCORE, MIN_SCORE, ROLE_ADMIN,
@@ -52,6 +56,34 @@ class Genre(SlugNameBaseModel):
         verbose_name_plural = 'Жанры'
 
 
+class TitleQuerySet(models.QuerySet):
+    """Набор произведений с операциями над сохранённым рейтингом."""
+
+    def touch(self):
+        """Отмечает произведения изменёнными, не загружая их."""
+        return self.update(updated_at=timezone.now())
+
+    def change_rating(self, score_delta, count_delta):
+        """Сдвигает сумму и количество оценок на заданные величины."""
+        return self.update(
+            rating_sum=F('rating_sum') + score_delta,
+            rating_count=F('rating_count') + count_delta,
+            updated_at=timezone.now(),
+        )
+
+    def recalculate_ratings(self):
+        """Пересчитывает сумму и количество оценок по всем отзывам."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')), 0),
+            rating_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('id')).values('total')), 0),
+            updated_at=timezone.now(),
+        )
+
+
 class Title(models.Model):
     """Произведения."""
     name = models.CharField(
@@ -77,16 +109,43 @@ class Title(models.Model):
         Genre,
         verbose_name='Жанр',
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок',
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество оценок',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
-        ordering = ('-year', 'name')
+        ordering = ('-year', 'name', 'id')
         default_related_name = 'titles'
+        indexes = [
+            models.Index(
+                fields=['-year', 'name', 'id'],
+                name='title_year_name_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name[:MAX_LENGTH_STR]}, {self.year} года.'
 
+    @property
+    def rating(self):
+        """Средняя оценка произведения или None, если отзывов нет."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum // self.rating_count
+
 
 class TextContent(models.Model):
     """Модель для текстового контента с автором и датой публикации."""
@@ -101,6 +160,10 @@ class TextContent(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
 
     class Meta:
         abstract = True
@@ -128,6 +191,12 @@ class Review(TextContent):
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -138,6 +207,22 @@ class Review(TextContent):
     def __str__(self):
         return f'Отзыв {self.author} на {self.title}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating()
+        return instance
+
+    def remember_rating(self):
+        """Запоминает произведение и оценку, учтённые в рейтинге."""
+        self._rated = (
+            self.__dict__.get('title_id'), self.__dict__.get('score'))
+
+    def save(self, *args, **kwargs):
+        """Сохраняет отзыв вместе с пересчётом рейтинга произведения."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(TextContent):
     """Комментарии к отзывам."""
@@ -151,11 +236,63 @@ class Comment(TextContent):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Комментарий {self.author} к отзыву {self.review}'
 
 
+class UserManager(BaseUserManager):
+
+    def upsert_confirmation_code(self, username, email, confirmation_code):
+        """Создаёт пользователя или обновляет ему код подтверждения одним
+        запросом INSERT ... ON CONFLICT (SQLite и PostgreSQL).
+
+        Возвращает False, если username занят пользователем с другим email.
+        Если email занят другим пользователем, возникает IntegrityError.
+        Сигналы post_save не отправляются.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        values = {
+            'username': username,
+            'email': email,
+            'confirmation_code': confirmation_code,
+            'date_joined': timezone.now(),
+        }
+        fields = [
+            field for field in self.model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        params = [
+            field.get_db_prep_save(
+                values.get(field.attname, field.get_default()), connection)
+            for field in fields
+        ]
+        table = quote_name(self.model._meta.db_table)
+        columns = {
+            name: quote_name(self.model._meta.get_field(name).column)
+            for name in ('username', 'email', 'confirmation_code')
+        }
+        sql = (
+            f'INSERT INTO {table} '
+            f'({", ".join(quote_name(field.column) for field in fields)}) '
+            f'VALUES ({", ".join(["%s"] * len(fields))}) '
+            f'ON CONFLICT ({columns["username"]}) DO UPDATE SET '
+            f'{columns["confirmation_code"]} = '
+            f'EXCLUDED.{columns["confirmation_code"]} '
+            f'WHERE {table}.{columns["email"]} = EXCLUDED.{columns["email"]}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount == 1
+
+
 class User(AbstractUser):
     """Модель пользователя."""
     email = models.EmailField(
@@ -196,6 +333,17 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        help_text='Увеличивается при изменении данных, записанных в токен; '
+                  'токены с прежней версией перестают действовать.',
+    )
+
+    objects = UserManager()
+
+    # Поля, значения которых записываются в токен доступа.
+    TOKEN_FIELDS = ('username', 'role', 'is_staff', 'is_active')
 
     def is_admin(self):
         """Проверяет, является ли пользователь администратором."""
@@ -208,7 +356,86 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_token_state()
+        instance.remember_username()
+        return instance
+
+    def get_token_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_FIELDS)
+
+    def remember_token_state(self):
+        """Запоминает значения полей, записанные в выданные токены."""
+        self._token_state = self.get_token_state()
+
+    def remember_username(self):
+        """Запоминает сохранённый username, выводимый в отзывах и
+        комментариях."""
+        self._saved_username = self.__dict__.get('username')
+
+    def save(self, *args, **kwargs):
+        """Отзывает выданные токены при изменении роли, статуса или
+        username пользователя."""
+        if not self._state.adding and getattr(
+                self, '_token_state', None) != self.get_token_state():
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self.remember_token_state()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('username',)
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+    recipient = models.EmailField(
+        'Получатель',
+        max_length=EMAIL_MAX_LENGTH,
+    )
+    subject = models.CharField(
+        'Тема',
+        max_length=MAX_LENGTH_NAME,
+    )
+    message = models.TextField('Текст')
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Число попыток',
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    sent_at = models.DateTimeField(
+        'Дата отправки',
+        blank=True,
+        null=True,
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(
+                fields=['sent_at', 'next_attempt_at'],
+                name='outgoing_email_pending_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.subject} для {self.recipient}'
@@ -0,0 +1,175 @@
+"""Очередь исходящих писем.
+
+Письмо сохраняется в таблицу в той же транзакции, что и изменения, ради
+которых оно отправляется, а доставляется после фиксации транзакции:
+в фоновом потоке процесса или командой send_outbox. Неудачные отправки
+повторяются с экспоненциально растущей задержкой: фоновые потоки
+проверяют очередь каждые OUTBOX_POLL_INTERVAL секунд.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock, Timer
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# Пока письмо отправляется, другие обработчики его не берут.
+LEASE = timedelta(minutes=5)
+
+_executor = None
+_executor_lock = Lock()
+_retry_timer = None
+
+
+def enqueue_email(recipient, subject, message):
+    """Ставит письмо в очередь и планирует отправку после фиксации."""
+    email = OutgoingEmail.objects.create(
+        recipient=recipient, subject=subject, message=message)
+    transaction.on_commit(lambda: dispatch([email.id]))
+    return email
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.OUTBOX_WORKERS,
+                thread_name_prefix='outbox',
+            )
+            schedule_retry()
+    return _executor
+
+
+def schedule_retry():
+    """Планирует проверку очереди фоновыми потоками через
+    OUTBOX_POLL_INTERVAL секунд."""
+    global _retry_timer
+    _retry_timer = Timer(settings.OUTBOX_POLL_INTERVAL, submit_retry)
+    _retry_timer.daemon = True
+    _retry_timer.start()
+
+
+def submit_retry():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.submit(retry_in_thread)
+
+
+def retry_in_thread():
+    """Отправляет все готовые письма, в том числе отложенные после
+    неудачных попыток, и планирует следующую проверку."""
+    try:
+        while any(send_pending()):
+            pass
+    finally:
+        connections.close_all()
+        with _executor_lock:
+            if _executor is not None:
+                schedule_retry()
+
+
+def shutdown():
+    """Останавливает фоновые потоки, дожидаясь начатых отправок."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+        if _retry_timer is not None:
+            _retry_timer.cancel()
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def dispatch(ids):
+    """Отправляет письма сразу или передаёт их фоновому потоку.
+
+    При OUTBOX_WORKERS = 0 письма остаются в очереди до запуска
+    команды send_outbox.
+    """
+    if not settings.OUTBOX_ASYNC:
+        send_pending(ids=ids)
+    elif settings.OUTBOX_WORKERS:
+        get_executor().submit(send_in_thread, ids)
+
+
+def send_in_thread(ids):
+    try:
+        send_pending(ids=ids)
+    finally:
+        # Соединения с базой данных у каждого потока свои.
+        connections.close_all()
+
+
+def get_retry_delay(attempts):
+    return min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_MAX_RETRY_DELAY,
+    )
+
+
+def record_failure(email, error):
+    email.attempts += 1
+    email.next_attempt_at = timezone.now() + timedelta(
+        seconds=get_retry_delay(email.attempts))
+    email.last_error = str(error)
+    return email
+
+
+def claim(batch_size, ids=None):
+    """Забирает пакет готовых к отправке писем, продлевая им срок
+    следующей попытки, чтобы их не взял другой обработчик."""
+    now = timezone.now()
+    lease_until = now + LEASE
+    pending = OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        next_attempt_at__lte=now,
+        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+    )
+    if ids is not None:
+        pending = pending.filter(id__in=ids)
+    with transaction.atomic():
+        claimed = list(pending.order_by('next_attempt_at').select_for_update(
+            skip_locked=True).values_list('id', flat=True)[:batch_size])
+        OutgoingEmail.objects.filter(
+            id__in=claimed, next_attempt_at__lte=now,
+        ).update(next_attempt_at=lease_until)
+    return list(OutgoingEmail.objects.filter(
+        id__in=claimed, next_attempt_at=lease_until))
+
+
+def send_pending(batch_size=None, ids=None):
+    """Отправляет один пакет писем через одно соединение с почтовым
+    сервером. Возвращает число отправленных и неудачных писем."""
+    emails = claim(batch_size or settings.OUTBOX_BATCH_SIZE, ids)
+    if not emails:
+        return 0, 0
+    sent, failed = [], []
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+        for email in emails:
+            try:
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.message,
+                    to=(email.recipient,),
+                    connection=mail_connection,
+                ).send()
+            except Exception as error:
+                failed.append(record_failure(email, error))
+            else:
+                sent.append(email.id)
+    except Exception as error:
+        # Почтовый сервер недоступен: попытка не удалась для всего пакета.
+        failed = [record_failure(email, error) for email in emails]
+    finally:
+        mail_connection.close()
+    OutgoingEmail.objects.filter(id__in=sent).update(
+        sent_at=timezone.now())
+    OutgoingEmail.objects.bulk_update(
+        failed, ('attempts', 'next_attempt_at', 'last_error'))
+    return len(sent), len(failed)
@@ -0,0 +1,82 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import Category, Comment, Genre, Review, Title, User
+
+# Отправляется после массовых изменений каталога в обход save()/delete().
+catalogue_changed = Signal()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """Учитывает новую или изменённую оценку в рейтинге произведения."""
+    if created:
+        Title.objects.filter(pk=instance.title_id).change_rating(
+            instance.score, 1)
+    else:
+        old_title_id, old_score = getattr(
+            instance, '_rated', (None, None))
+        if old_title_id is None or old_score is None:
+            Title.objects.filter(
+                pk=instance.title_id).recalculate_ratings()
+        elif old_title_id != instance.title_id:
+            Title.objects.filter(pk=old_title_id).change_rating(
+                -old_score, -1)
+            Title.objects.filter(pk=instance.title_id).change_rating(
+                instance.score, 1)
+        elif old_score != instance.score:
+            Title.objects.filter(pk=instance.title_id).change_rating(
+                instance.score - old_score, 0)
+    instance.remember_rating()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Исключает оценку удалённого отзыва, в том числе при каскаде."""
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        -instance.score, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def touch_titles_on_save(sender, instance, created, **kwargs):
+    """Отмечает изменёнными произведения переименованной категории/жанра."""
+    if not created:
+        instance.titles.touch()
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_delete(sender, instance, **kwargs):
+    """Отмечает изменёнными произведения удаляемой категории/жанра."""
+    instance.titles.touch()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genre_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Отмечает изменёнными произведения при смене набора жанров."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        Title.objects.filter(pk=instance.pk).touch()
+    elif action == 'pre_clear':
+        instance.titles.touch()
+    else:
+        Title.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver(post_save, sender=User)
+def touch_texts_on_rename(sender, instance, created, **kwargs):
+    """Отмечает изменёнными отзывы и комментарии переименованного
+    пользователя: его username выводится в поле author."""
+    old_username = getattr(instance, '_saved_username', None)
+    instance.remember_username()
+    if created or old_username in (None, instance.username):
+        return
+    now = timezone.now()
+    Review.objects.filter(author=instance).update(updated_at=now)
+    Comment.objects.filter(author=instance).update(updated_at=now)
+    catalogue_changed.send(sender=User)
@@ -6,9 +6,8 @@ from rest_framework.exceptions import ValidationError
 
 
 def username_validator(username):
-    if username == settings.PROFILE_URL_SEGMENT:
-        raise ValidationError(
-            f'Логин "{settings.PROFILE_URL_SEGMENT}" запрещен.')
+    if username in (settings.PROFILE_URL_SEGMENT, settings.BULK_URL_SEGMENT):
+        raise ValidationError(f'Логин "{username}" запрещен.')
     invalid_chars = re.findall(r'[^\w.@+-]', username)
     if invalid_chars:
         raise ValidationError(
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+from django.core.cache import cache
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +35,18 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from api.authentication import user_cache
+    from api.cache import state_cache
+
+    cache.clear()
+    state_cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def send_outbox_on_commit(settings):
+    settings.OUTBOX_ASYNC = False
@@ -0,0 +1,177 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+def create_catalogue(count):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+    for number in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+        title.genre.set(genres)
+
+
+def create_discussion(count):
+    title = Title.objects.create(name='Произведение', year=2000)
+    authors = [
+        User.objects.create(
+            username=f'author_{number}', email=f'author_{number}@yamdb.fake'
+        )
+        for number in range(count)
+    ]
+    reviews = [
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=5)
+        for author in authors
+    ]
+    Comment.objects.bulk_create(
+        Comment(review=reviews[0], author=author, text='Комментарий')
+        for author in authors
+    )
+    return title, reviews[0]
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09TitleQueries:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    @pytest.mark.parametrize('titles_count', (1, 10))
+    def test_01_title_list_constant_queries(self, client, titles_count):
+        create_catalogue(titles_count)
+        assert count_queries(client, self.TITLES_URL) == 3, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` загружает '
+            'страницу произведений с категориями и жанрами за постоянное '
+            'число запросов к базе данных.'
+        )
+
+    def test_02_title_detail_constant_queries(self, client):
+        create_catalogue(1)
+        title = Title.objects.get()
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=title.id)
+        assert count_queries(client, url) == 2, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE}` '
+            'загружает произведение с категорией и жанрами за постоянное '
+            'число запросов к базе данных.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09ReviewCommentQueries:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    @pytest.mark.parametrize('page_size', (10, 50, 100))
+    def test_01_review_list_constant_queries(self, client, monkeypatch,
+                                             page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, _ = create_discussion(page_size)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        assert count_queries(client, url) == 3, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'загружает авторов отзывов вместе с отзывами, а не отдельным '
+            'запросом для каждого отзыва.'
+        )
+
+    @pytest.mark.parametrize('page_size', (10, 50, 100))
+    def test_02_comment_list_constant_queries(self, client, monkeypatch,
+                                              page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, review = create_discussion(page_size)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=title.id, review_id=review.id
+        )
+        assert count_queries(client, url) == 3, (
+            f'Проверьте, что GET-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'загружает авторов комментариев вместе с комментариями, а не '
+            'отдельным запросом для каждого комментария.'
+        )
+
+    def test_03_review_detail_single_query(self, client):
+        title, review = create_discussion(1)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        assert count_queries(client, f'{url}{review.id}/') == 1, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}'
+            '{review_id}/` находит отзыв одним запросом с условием на '
+            '`title_id`, без отдельной загрузки произведения.'
+        )
+
+    def test_04_comments_of_review_from_other_title(self, client):
+        _, review = create_discussion(1)
+        other_title = Title.objects.create(name='Другое', year=2000)
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=other_title.id, review_id=review.id
+        )
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что GET-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'для отзыва, не относящегося к произведению из URL, возвращает '
+            'ответ со статусом 404.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09SignupQueries:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    SIGNUP_DATA = {'email': 'query@yamdb.fake', 'username': 'query_user'}
+
+    def signup(self, client, data):
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.URL_SIGNUP, data=data)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not query['sql'].startswith(('BEGIN', 'SAVEPOINT', 'RELEASE'))
+        ]
+        return response, queries
+
+    def test_01_signup_single_upsert(self, client, settings):
+        settings.OUTBOX_ASYNC = True
+        settings.OUTBOX_WORKERS = 0
+        for _ in range(2):
+            response, queries = self.signup(client, self.SIGNUP_DATA)
+            assert response.status_code == HTTPStatus.OK
+            assert len(queries) == 2, (
+                f'Проверьте, что POST-запрос к `{self.URL_SIGNUP}` создаёт '
+                'пользователя или обновляет код подтверждения одним '
+                'запросом и ещё одним ставит письмо в очередь.'
+            )
+        assert User.objects.get().confirmation_code
+
+    def test_02_signup_conflicts(self, client):
+        User.objects.create(username='taken', email='taken@yamdb.fake')
+        response, queries = self.signup(
+            client, {'username': 'taken', 'email': 'other@yamdb.fake'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'username' in response.json()
+        response, queries = self.signup(
+            client, {'username': 'other', 'email': 'taken@yamdb.fake'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'email' in response.json()
+        assert len(queries) == 1, (
+            'Проверьте, что причина конфликта при регистрации определяется '
+            'без дополнительных запросов к базе данных.'
+        )
+        assert User.objects.count() == 1
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import CATALOGUE_NAMESPACE, get_version, response_cache_stats
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ResponseCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLES_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    CATEGORIES_URL = '/api/v1/categories/'
+
+    def test_01_repeated_get_is_served_from_cache(self, admin_client,
+                                                  client):
+        create_titles(admin_client)
+        first = client.get(self.TITLES_URL, {'year': 1984})
+        with CaptureQueriesContext(connection) as context:
+            second = client.get(self.TITLES_URL, {'year': 1984})
+        assert second.status_code == HTTPStatus.OK
+        assert second.json() == first.json()
+        assert len(context.captured_queries) == 0, (
+            f'Проверьте, что повторный GET-запрос к `{self.TITLES_URL}` '
+            'с теми же параметрами обслуживается из кэша без обращений к '
+            'базе данных.'
+        )
+        assert response_cache_stats() == {'hits': 1, 'misses': 1}
+
+    def test_02_writes_invalidate_cache(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        assert user_client.get(url).json()['rating'] is None
+
+        create_single_review(user_client, titles[0]['id'], 'Хорошо', 8)
+        assert user_client.get(url).json()['rating'] == 8, (
+            'Проверьте, что создание отзыва сбрасывает кэш ответов с '
+            'рейтингом произведения.'
+        )
+
+        response = user_client.get(self.CATEGORIES_URL)
+        assert response.json()['count'] == 2
+        admin_client.post(
+            self.CATEGORIES_URL, data={'name': 'Музыка', 'slug': 'music'}
+        )
+        response = user_client.get(self.CATEGORIES_URL)
+        assert response.json()['count'] == 3, (
+            f'Проверьте, что POST-запрос к `{self.CATEGORIES_URL}` '
+            'сбрасывает кэш списка категорий.'
+        )
+
+    def test_03_unknown_params_bypass_cache(self, admin_client, client):
+        create_titles(admin_client)
+        for number in range(3):
+            response = client.get(self.TITLES_URL, {'x': number})
+            assert response.status_code == HTTPStatus.OK
+        assert response_cache_stats() == {'hits': 0, 'misses': 0}, (
+            'Проверьте, что запросы с параметрами, которые вьюсет не '
+            'использует, не создают записей в кэше ответов.'
+        )
+        client.get(self.TITLES_URL, {'year': 1984, 'page': 1})
+        client.get(self.TITLES_URL, {'page': 1, 'year': 1984})
+        assert response_cache_stats() == {'hits': 1, 'misses': 1}, (
+            'Проверьте, что фильтры и номер страницы входят в ключ кэша '
+            'ответов.'
+        )
+
+    def test_04_versions_survive_response_cache_clear(self):
+        version = get_version(CATALOGUE_NAMESPACE)
+        cache.clear()
+        assert get_version(CATALOGUE_NAMESPACE) == version, (
+            'Проверьте, что версии пространств ключей хранятся отдельно '
+            'от кэша ответов и не вытесняются его записями.'
+        )
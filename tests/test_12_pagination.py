@@ -0,0 +1,164 @@
+import json
+from base64 import urlsafe_b64encode
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reviews.models import Comment, Genre, Review, Title, User
+
+
+def create_reviews_with_ties(count):
+    title = Title.objects.create(name='Произведение', year=2000)
+    for number in range(count):
+        author = User.objects.create(
+            username=f'author_{number}', email=f'author_{number}@yamdb.fake'
+        )
+        review = Review.objects.create(
+            title=title, author=author, text=f'Отзыв {number}', score=5
+        )
+        Comment.objects.create(
+            review=review, author=author, text=f'Комментарий {number}'
+        )
+    Review.objects.update(pub_date=timezone.now())
+    return title
+
+
+def encode_cursor(position, reverse=0):
+    return urlsafe_b64encode(
+        json.dumps({'p': position, 'r': reverse}).encode()).decode()
+
+
+def walk(client, url):
+    ids = []
+    with CaptureQueriesContext(connection) as context:
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+    return ids, context.captured_queries
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12KeysetPagination:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def test_01_reviews_cursor_walk(self, client):
+        title = create_reviews_with_ties(25)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        expected = list(
+            Review.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True)
+        )
+        ids, queries = walk(client, f'{url}?pagination=cursor')
+        assert ids == expected, (
+            f'Проверьте, что курсорная пагинация `{self.REVIEWS_URL_TEMPLATE}'
+            '?pagination=cursor` обходит все отзывы ровно один раз в порядке '
+            '(-pub_date, -id), в том числе при совпадающих датах.'
+        )
+        assert not any(
+            'COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+            for query in queries
+        ), 'Курсорный режим не должен выполнять COUNT(*) и OFFSET.'
+
+    def test_02_reviews_cursor_previous(self, client):
+        title = create_reviews_with_ties(25)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        first = client.get(f'{url}?pagination=cursor').json()
+        second = client.get(first['next']).json()
+        assert second['previous']
+        back = client.get(second['previous']).json()
+        assert back['results'] == first['results'], (
+            'Проверьте, что ссылка `previous` курсорной пагинации '
+            'возвращает предыдущую страницу.'
+        )
+
+    def test_03_comments_cursor_walk(self, client):
+        title = create_reviews_with_ties(3)
+        review = Review.objects.first()
+        url = (
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+            '?pagination=cursor'
+        )
+        ids, _ = walk(client, url)
+        assert ids == list(review.comments.values_list('id', flat=True))
+
+    def test_04_page_number_mode_kept(self, client):
+        title = create_reviews_with_ties(12)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        data = client.get(url).json()
+        assert data['count'] == 12
+        assert len(data['results']) == 10
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleKeysetPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_titles_cursor_walk_with_filter(self, client):
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        for number in range(30):
+            title = Title.objects.create(
+                name=f'Произведение {number % 7}', year=2000 + number % 3
+            )
+            if number % 2:
+                title.genre.add(drama)
+        expected = list(
+            Title.objects.filter(genre__slug='drama').order_by(
+                '-year', 'name', 'id').values_list('id', flat=True)
+        )
+        ids, _ = walk(
+            client, f'{self.TITLES_URL}?pagination=cursor&genre=drama'
+        )
+        assert ids == expected, (
+            f'Проверьте, что курсорная пагинация `{self.TITLES_URL}'
+            '?pagination=cursor` учитывает фильтры и обходит произведения '
+            'ровно один раз в порядке (-year, name, id).'
+        )
+
+    def test_02_tampered_cursor(self, client):
+        title = create_reviews_with_ties(3)
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        for url, position in (
+                (f'{self.TITLES_URL}?pagination=cursor', ['a', 'b', 'c']),
+                (f'{self.TITLES_URL}?pagination=cursor', [None, 'b', 1]),
+                (f'{self.TITLES_URL}?pagination=cursor', [10 ** 30, 'b', 1]),
+                (reviews_url, ['вчера', 1]),
+                (reviews_url, [{'a': 1}, [1]])):
+            response = client.get(f'{url}&cursor={encode_cursor(position)}')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что курсор с некорректными значениями полей '
+                'возвращает ответ со статусом 404.'
+            )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12CachedCount:
+
+    USERS_URL = '/api/v1/users/'
+
+    def test_01_count_is_cached_and_invalidated(self, admin_client, admin):
+        assert admin_client.get(self.USERS_URL).json()['count'] == 1
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(self.USERS_URL)
+        assert response.json()['count'] == 1
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), (
+            f'Проверьте, что повторный GET-запрос к `{self.USERS_URL}` '
+            'берёт количество объектов из кэша.'
+        )
+
+        User.objects.create(username='new_user', email='new@yamdb.fake')
+        assert admin_client.get(self.USERS_URL).json()['count'] == 2, (
+            'Проверьте, что создание пользователя сбрасывает кэш '
+            'количества пользователей.'
+        )
+        response = admin_client.get(self.USERS_URL, {'search': 'new'})
+        assert response.json()['count'] == 1
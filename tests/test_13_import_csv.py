@@ -0,0 +1,260 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from reviews.management.commands.import_csv import (DATA_PATH, Checkpoint,
+                                                    CsvReader)
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+def import_csv(tmp_path, *args):
+    call_command(
+        'import_csv', *args, checkpoint_dir=str(tmp_path), stdout=StringIO()
+    )
+    return get_ids()
+
+
+def copy_data(tmp_path):
+    path = tmp_path / 'data'
+    shutil.copytree(DATA_PATH, path)
+    return path
+
+
+def run_manage(tmp_path, database, *args):
+    """Запускает manage.py в отдельном процессе с базой в файле: базу в
+    памяти, которую создаёт pytest, не видят дочерние процессы импорта."""
+    settings_path = tmp_path / 'file_db_settings.py'
+    if not settings_path.exists():
+        settings_path.write_text(
+            'import os\n'
+            'from api_yamdb.settings import *  # noqa\n'
+            "DATABASES['default'] = {\n"
+            "    'ENGINE': 'django.db.backends.sqlite3',\n"
+            "    'NAME': os.environ['IMPORT_TEST_DATABASE'],\n"
+            '}\n'
+        )
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'file_db_settings',
+        'IMPORT_TEST_DATABASE': str(database),
+        'PYTHONPATH': os.pathsep.join((str(tmp_path), str(settings.BASE_DIR))),
+    }
+    result = subprocess.run(
+        (sys.executable, str(settings.BASE_DIR / 'manage.py'), *args),
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return result.stdout
+
+
+def dump_tables(database):
+    """Строки импортируемых таблиц без колонок с временем изменения."""
+    tables = {}
+    with sqlite3.connect(database) as db:
+        for model in (User, Category, Genre, Title, Review, Comment,
+                      Title.genre.through):
+            table = model._meta.db_table
+            columns = ', '.join(
+                row[1] for row in db.execute(f'PRAGMA table_info({table})')
+                if row[1] not in ('pub_date', 'updated_at', 'date_joined')
+            )
+            tables[table] = db.execute(
+                f'SELECT {columns} FROM {table} ORDER BY id').fetchall()
+    return tables
+
+
+def get_ids():
+    return {
+        model.__name__: sorted(model.objects.values_list('id', flat=True))
+        for model in (User, Category, Genre, Title, Review, Comment,
+                      Title.genre.through)
+    }
+
+
+def get_state():
+    return (
+        list(Title.objects.values_list(
+            'id', 'name', 'category_id', 'rating_sum', 'rating_count'
+        ).order_by('id')),
+        list(Review.objects.values_list(
+            'id', 'title_id', 'author_id', 'score', 'text'
+        ).order_by('id')),
+        list(User.objects.values_list(
+            'id', 'username', 'email', 'role', 'is_active'
+        ).order_by('id')),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ImportCsv:
+
+    def test_01_fast_import_matches_regular(self, tmp_path):
+        regular = import_csv(tmp_path / 'regular')
+        regular_state = get_state()
+        for model in (Comment, Review, Title, Genre, Category, User):
+            model.objects.all().delete()
+
+        fast = import_csv(tmp_path / 'fast', '--fast')
+        assert fast == regular, (
+            'Проверьте, что импорт с параметром `--fast` загружает те же '
+            'записи, что и обычный импорт.'
+        )
+        assert get_state() == regular_state, (
+            'Проверьте, что импорт с параметром `--fast` заполняет поля так '
+            'же, как обычный импорт, включая значения по умолчанию и рейтинг.'
+        )
+        assert all(review.pub_date for review in Review.objects.all())
+
+    def test_02_fast_import_reports_skipped_rows(self, tmp_path):
+        path = copy_data(tmp_path)
+        rows = (path / 'category.csv').read_text(encoding='utf-8')
+        (path / 'category.csv').write_text(
+            f'{rows.rstrip()}\n1,Дубль,duplicate\n', encoding='utf-8')
+        stdout = StringIO()
+        call_command(
+            'import_csv', '--fast', path=str(path),
+            checkpoint_dir=str(tmp_path / 'checkpoints'), stdout=stdout
+        )
+        assert 'category.csv: 1 строк не вставлено' in stdout.getvalue(), (
+            'Проверьте, что импорт с параметром `--fast` сообщает о строках, '
+            'которые не были вставлены.'
+        )
+        assert not Category.objects.filter(slug='duplicate').exists()
+
+    def test_03_fast_import_integrity_error(self, tmp_path):
+        with connection.constraint_checks_disabled():
+            Title.genre.through.objects.create(title_id=999, genre_id=999)
+        with pytest.raises(CommandError, match='reviews_title_genre'):
+            import_csv(tmp_path, '--fast')
+        assert Title.objects.exists(), (
+            'Проверьте, что данные, загруженные до проверки целостности, '
+            'остаются в базе.'
+        )
+
+
+class Test13ParallelImport:
+
+    def test_01_workers_match_sequential(self, tmp_path):
+        parallel_db = tmp_path / 'parallel.sqlite3'
+        sequential_db = tmp_path / 'sequential.sqlite3'
+        run_manage(tmp_path, parallel_db, 'migrate', '--verbosity', '0')
+        shutil.copy(parallel_db, sequential_db)
+
+        output = run_manage(
+            tmp_path, parallel_db, 'import_csv', '--workers', '3',
+            '--checkpoint-dir', str(tmp_path / 'parallel'))
+        run_manage(
+            tmp_path, sequential_db, 'import_csv',
+            '--checkpoint-dir', str(tmp_path / 'sequential'))
+
+        stages = re.findall(r'^Этап (\d) \((.+)\): \d+\.\d+ с$', output,
+                            flags=re.MULTILINE)
+        assert stages == [
+            ('1', 'users.csv, category.csv, genre.csv'),
+            ('2', 'titles.csv'),
+            ('3', 'review.csv, genre_title.csv'),
+            ('4', 'comments.csv'),
+        ], (
+            'Проверьте, что импорт с параметром `--workers` выводит время '
+            'каждого этапа.'
+        )
+        parallel = dump_tables(parallel_db)
+        assert all(parallel.values())
+        assert parallel == dump_tables(sequential_db), (
+            'Проверьте, что импорт с параметром `--workers` загружает те же '
+            'данные, что и последовательный импорт.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ResumeImport:
+
+    @pytest.mark.parametrize('args', ([], ['--fast']))
+    def test_01_resume_after_interruption(self, tmp_path, args):
+        path = copy_data(tmp_path)
+        checkpoints = tmp_path / 'checkpoints'
+        call_command('import_csv', *args, path=str(path),
+                     checkpoint_dir=str(checkpoints), stdout=StringIO())
+        expected_ids, expected_state = get_ids(), get_state()
+
+        with open(path / 'review.csv', 'rb') as file:
+            offsets = [offset for _, offset in CsvReader(file)]
+        # Импорт прерван после 30 строк отзывов, сохранённых в прогрессе,
+        # а ещё 10 строк успели записаться без сохранения прогресса.
+        Review.objects.filter(id__gt=expected_ids['Review'][39]).delete()
+        Checkpoint(checkpoints, path / 'review.csv').save(offsets[29], 30)
+        for file_name in ('comments.csv', 'genre_title.csv'):
+            (checkpoints / f'{file_name}.json').unlink()
+        # Прогресс для изменённого файла недействителен.
+        Checkpoint(checkpoints, path / 'genre_title.csv').save(0, 0, True)
+        (path / 'genre_title.csv').write_text(
+            (path / 'genre_title.csv').read_text() + '\n', encoding='utf-8')
+        Title.genre.through.objects.all().delete()
+
+        stdout = StringIO()
+        call_command('import_csv', '--resume', *args, path=str(path),
+                     checkpoint_dir=str(checkpoints), stdout=stdout)
+        output = stdout.getvalue()
+        assert 'users.csv уже импортирован, пропуск' in output, (
+            'Проверьте, что импорт с параметром `--resume` пропускает '
+            'полностью импортированные файлы.'
+        )
+        assert 'review.csv: продолжение со строки 31' in output, (
+            'Проверьте, что импорт с параметром `--resume` продолжает файл '
+            'с сохранённого смещения.'
+        )
+        assert 'genre_title.csv уже импортирован' not in output, (
+            'Проверьте, что прогресс изменённого CSV-файла не используется.'
+        )
+        assert get_ids() == expected_ids
+        assert get_state() == expected_state, (
+            'Проверьте, что после импорта с параметром `--resume` каждая '
+            'строка импортирована ровно один раз.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ExportData:
+
+    def test_01_export_round_trip(self, tmp_path):
+        imported = import_csv(tmp_path / 'checkpoints')
+        state = get_state()
+        call_command('export_data', path=str(tmp_path / 'export'),
+                     chunk_size=10, stdout=StringIO())
+        for model in (Comment, Review, Title, Genre, Category, User):
+            model.objects.all().delete()
+
+        call_command(
+            'import_csv', path=str(tmp_path / 'export'),
+            checkpoint_dir=str(tmp_path / 'export_checkpoints'),
+            stdout=StringIO()
+        )
+        assert get_ids() == imported
+        assert get_state() == state, (
+            'Проверьте, что файлы, выгруженные командой `export_data`, '
+            'загружаются командой `import_csv` без потери данных.'
+        )
+
+    def test_02_export_ndjson_gzip(self, tmp_path):
+        import_csv(tmp_path / 'checkpoints')
+        call_command('export_data', path=str(tmp_path), format='ndjson',
+                     compress='gzip', stdout=StringIO())
+        with gzip.open(tmp_path / 'review.ndjson.gz', 'rt') as file:
+            reviews = [json.loads(line) for line in file]
+        assert [review['id'] for review in reviews] == list(
+            Review.objects.order_by('id').values_list('id', flat=True)
+        ), (
+            'Проверьте, что `export_data --format ndjson --compress gzip` '
+            'выгружает по одному JSON-объекту на строку.'
+        )
+        assert reviews[0]['author'] == Review.objects.get(
+            id=reviews[0]['id']).author_id
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from time import monotonic, sleep
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.utils import timezone
+from reviews import outbox
+from reviews.models import OutgoingEmail
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+SIGNUP_DATA = {'email': 'outbox@yamdb.fake', 'username': 'outbox_user'}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14Outbox:
+
+    def test_01_email_stays_queued_without_workers(self, client, settings):
+        settings.OUTBOX_ASYNC = True
+        settings.OUTBOX_WORKERS = 0
+        response = client.post(URL_SIGNUP, data=SIGNUP_DATA)
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что эндпоинт регистрации не отправляет письмо '
+            'в ходе запроса, а ставит его в очередь.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipient == SIGNUP_DATA['email']
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что команда `send_outbox` отправляет письма из '
+            'очереди.'
+        )
+        email.refresh_from_db()
+        assert email.sent_at is not None
+        call_command('send_outbox')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что отправленные письма не отправляются повторно.'
+        )
+
+    def test_02_failed_email_is_retried_later(self, client, monkeypatch):
+        def fail(self):
+            raise ConnectionError('SMTP недоступен')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(EmailMessage, 'send', fail)
+            response = client.post(URL_SIGNUP, data=SIGNUP_DATA)
+        assert response.status_code == 200, (
+            'Проверьте, что ошибка почтового сервера не приводит к ошибке '
+            'регистрации.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is None
+        assert email.attempts == 1
+        assert email.next_attempt_at > timezone.now(), (
+            'Проверьте, что повторная отправка откладывается.'
+        )
+        assert 'SMTP недоступен' in email.last_error
+
+        call_command('send_outbox')
+        assert len(mail.outbox) == 0
+
+        OutgoingEmail.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1))
+        call_command('send_outbox')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что письмо отправляется повторно после задержки.'
+        )
+
+    def test_03_workers_retry_failed_email(self, client, settings,
+                                           monkeypatch):
+        settings.OUTBOX_ASYNC = True
+        settings.OUTBOX_WORKERS = 1
+        settings.OUTBOX_RETRY_DELAY = 0
+        settings.OUTBOX_POLL_INTERVAL = 0.05
+        send = EmailMessage.send
+        calls = []
+
+        def fail_once(self):
+            calls.append(self.to)
+            if len(calls) == 1:
+                raise ConnectionError('SMTP недоступен')
+            return send(self)
+
+        monkeypatch.setattr(EmailMessage, 'send', fail_once)
+        try:
+            response = client.post(URL_SIGNUP, data=SIGNUP_DATA)
+            assert response.status_code == 200
+            deadline = monotonic() + 5
+            while not mail.outbox and monotonic() < deadline:
+                sleep(0.05)
+        finally:
+            outbox.shutdown()
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что фоновые потоки повторяют неудачную отправку '
+            'без запуска команды `send_outbox`.'
+        )
+        assert len(calls) == 2
+        email = OutgoingEmail.objects.get()
+        assert email.sent_at is not None
+        assert email.attempts == 1
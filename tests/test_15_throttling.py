@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from threading import Barrier
+from time import sleep
+
+import pytest
+from api.cache import state_cache
+from api.throttling import SlidingWindowThrottle, TokenUsernameThrottle
+from django.core.cache import caches
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+URL_SIGNUP = '/api/v1/auth/signup/'
+URL_TOKEN = '/api/v1/auth/token/'
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    rates = {
+        'signup': '3/min',
+        'signup_username': '2/min',
+        'token': '3/min',
+        'token_username': '2/min',
+    }
+    monkeypatch.setattr(SlidingWindowThrottle, 'THROTTLE_RATES', rates)
+    return rates
+
+
+def post_token(client, username):
+    return client.post(
+        URL_TOKEN, data={'username': username, 'confirmation_code': '000000'}
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Throttling:
+
+    def test_01_token_throttled_by_username(self, client, rates):
+        for _ in range(2):
+            assert post_token(client, 'victim').status_code != (
+                HTTPStatus.TOO_MANY_REQUESTS
+            )
+        response = post_token(client, 'victim')
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f'Проверьте, что частые POST-запросы к `{URL_TOKEN}` с одним '
+            'и тем же `username` ограничиваются ответом со статусом 429.'
+        )
+        assert int(response['Retry-After']) > 0, (
+            'Проверьте, что ответ со статусом 429 содержит заголовок '
+            '`Retry-After`.'
+        )
+
+    def test_02_token_throttled_by_ip(self, client, rates):
+        for number in range(3):
+            assert post_token(client, f'user_{number}').status_code != (
+                HTTPStatus.TOO_MANY_REQUESTS
+            )
+        assert post_token(client, 'user_4').status_code == (
+            HTTPStatus.TOO_MANY_REQUESTS
+        ), (
+            f'Проверьте, что частые POST-запросы к `{URL_TOKEN}` с одного '
+            'IP-адреса ограничиваются независимо от `username`.'
+        )
+
+    def test_03_signup_throttled(self, client, rates):
+        data = {'username': 'spammer', 'email': 'spammer@yamdb.fake'}
+        for _ in range(2):
+            assert client.post(URL_SIGNUP, data=data).status_code == (
+                HTTPStatus.OK
+            )
+        assert client.post(URL_SIGNUP, data=data).status_code == (
+            HTTPStatus.TOO_MANY_REQUESTS
+        ), (
+            f'Проверьте, что частые POST-запросы к `{URL_SIGNUP}` '
+            'ограничиваются ответом со статусом 429.'
+        )
+
+    def test_04_forwarded_for_ignored(self, client, rates):
+        statuses = [
+            client.post(
+                URL_SIGNUP,
+                data={'username': f'spammer_{number}',
+                      'email': f'spammer_{number}@yamdb.fake'},
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{number}',
+            ).status_code
+            for number in range(4)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что ограничение по IP-адресу нельзя обойти, '
+            'меняя заголовок `X-Forwarded-For` без настроенных прокси.'
+        )
+
+    def test_05_fallback_without_cache(self, client, rates, monkeypatch):
+        def unavailable(*args, **kwargs):
+            raise ConnectionError('Кэш недоступен')
+
+        for method in ('add', 'incr', 'decr', 'get'):
+            monkeypatch.setattr(state_cache, method, unavailable)
+        statuses = [post_token(client, 'offline').status_code
+                    for _ in range(3)]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что ограничение частоты запросов работает и при '
+            'недоступном кэше.'
+        )
+
+    def test_06_concurrent_requests(self, rates, monkeypatch):
+        # Кэш у каждого потока свой, поэтому заменяется метод класса.
+        backend = type(caches['state'])
+        get = backend.get
+
+        def slow_get(self, *args, **kwargs):
+            # Между чтением и записью состояния успевают прийти другие
+            # запросы.
+            value = get(self, *args, **kwargs)
+            sleep(0.01)
+            return value
+
+        monkeypatch.setattr(backend, 'get', slow_get)
+        factory = APIRequestFactory()
+        workers = 10
+        barrier = Barrier(workers)
+
+        def allow(_):
+            request = Request(
+                factory.post(URL_TOKEN, {'username': 'victim'},
+                             format='json'),
+                parsers=[JSONParser()],
+            )
+            barrier.wait()
+            return TokenUsernameThrottle().allow_request(request, None)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            allowed = list(pool.map(allow, range(workers)))
+        assert allowed.count(True) == 2, (
+            'Проверьте, что одновременные запросы с одним `username` '
+            'не проходят сверх установленного лимита.'
+        )
@@ -0,0 +1,129 @@
+from http import HTTPStatus
+
+import pytest
+from api.authentication import ClaimsAccessToken
+from api.cache import LocalStore
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+URL_USERS = '/api/v1/users/'
+URL_ME = '/api/v1/users/me/'
+URL_CATEGORIES = '/api/v1/categories/'
+
+
+def get_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+    )
+    return client
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if '"reviews_user"' in query['sql']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16ClaimsAuthentication:
+
+    def test_01_token_contains_claims(self, client, user):
+        user.confirmation_code = '123456'
+        user.save()
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username, 'confirmation_code': '123456'
+        })
+        assert response.status_code == HTTPStatus.OK
+        token = ClaimsAccessToken(response.json()['token'])
+        assert token['username'] == user.username
+        assert token['role'] == user.role
+        assert token['is_staff'] is False
+        assert token['token_version'] == user.token_version
+
+    def test_02_user_is_not_loaded_per_request(self, admin):
+        client = get_client(admin)
+        response, queries = user_queries(client, URL_CATEGORIES)
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) == 1
+        response, queries = user_queries(client, URL_CATEGORIES)
+        assert response.status_code == HTTPStatus.OK
+        assert queries == [], (
+            'Проверьте, что пользователь аутентифицируется по данным '
+            'токена без запроса к таблице пользователей.'
+        )
+        assert client.get(URL_USERS).status_code == HTTPStatus.OK, (
+            'Проверьте, что права администратора определяются по роли '
+            'из токена.'
+        )
+
+    def test_03_role_change_revokes_token(self, admin):
+        client = get_client(admin)
+        assert client.get(URL_USERS).status_code == HTTPStatus.OK
+        admin.role = 'user'
+        admin.save()
+        assert client.get(URL_USERS).status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что после изменения роли пользователя выданные ему '
+            'токены перестают действовать.'
+        )
+        assert get_client(admin).get(URL_USERS).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+
+    def test_04_unrelated_change_keeps_token(self, user):
+        client = get_client(user)
+        user.bio = 'Новое описание'
+        user.save()
+        response = client.get(URL_ME)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['bio'] == 'Новое описание', (
+            f'Проверьте, что `{URL_ME}` возвращает профиль пользователя '
+            'целиком, а не только данные из токена.'
+        )
+
+    def test_05_deleted_user_token_rejected(self, user):
+        client = get_client(user)
+        user.delete()
+        assert client.get(URL_ME).status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16UserCache:
+
+    def test_01_user_cached_for_plain_tokens(self, admin_client, admin):
+        response, queries = user_queries(admin_client, URL_CATEGORIES)
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) == 1
+        response, queries = user_queries(admin_client, URL_CATEGORIES)
+        assert queries == [], (
+            'Проверьте, что данные пользователя для проверки прав берутся '
+            'из кэша процесса.'
+        )
+
+    def test_02_role_change_invalidates_cache(self, admin_client, admin):
+        assert admin_client.get(URL_USERS).status_code == HTTPStatus.OK
+        admin.role = 'user'
+        admin.save()
+        assert admin_client.get(URL_USERS).status_code == (
+            HTTPStatus.FORBIDDEN
+        ), (
+            'Проверьте, что изменение роли пользователя сбрасывает его '
+            'данные в кэше процесса.'
+        )
+
+    def test_03_least_recently_used_evicted(self):
+        store = LocalStore(max_size=2)
+        store.set('first', 1, 60)
+        store.set('second', 2, 60)
+        assert store.get('first') == 1
+        store.set('third', 3, 60)
+        assert store.get('first') == 1, (
+            'Проверьте, что кэш процесса вытесняет давно не использовавшиеся '
+            'записи, а не записанные раньше других.'
+        )
+        assert store.get('second') is None
+        assert store.get('third') == 3
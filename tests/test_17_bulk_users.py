@@ -0,0 +1,107 @@
+from http import HTTPStatus
+
+import pytest
+from api.authentication import ClaimsAccessToken
+from rest_framework.test import APIClient
+
+URL_BULK = '/api/v1/users/bulk/'
+URL_USERS = '/api/v1/users/'
+
+
+def create_users(admin_client, count):
+    response = admin_client.post(URL_BULK, data=[
+        {'username': f'bulk_{number}', 'email': f'bulk_{number}@yamdb.fake'}
+        for number in range(count)
+    ], format='json')
+    assert response.status_code == HTTPStatus.OK
+    return response.json()['results']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17BulkUsers:
+
+    def test_01_bulk_create(self, admin_client, admin, django_user_model):
+        results = create_users(admin_client, 3)
+        assert [result['status'] for result in results] == [201] * 3, (
+            f'Проверьте, что POST-запрос к `{URL_BULK}` создаёт '
+            'пользователей из списка и возвращает результат для каждого.'
+        )
+        assert results[0]['data']['username'] == 'bulk_0'
+        assert django_user_model.objects.count() == 4
+
+        response = admin_client.post(URL_BULK, data=[
+            {'username': 'fresh', 'email': 'fresh@yamdb.fake'},
+            {'username': 'bulk_0', 'email': 'other@yamdb.fake'},
+            {'username': 'twice', 'email': 'twice@yamdb.fake'},
+            {'username': 'twice', 'email': 'twice2@yamdb.fake'},
+            {'username': 'no_email'},
+        ], format='json')
+        statuses = [item['status'] for item in response.json()['results']]
+        assert statuses == [201, 400, 201, 400, 400], (
+            f'Проверьте, что POST-запрос к `{URL_BULK}` создаёт корректные '
+            'элементы списка и возвращает ошибки для остальных.'
+        )
+        assert 'username' in response.json()['results'][1]['errors']
+        assert django_user_model.objects.count() == 6
+        assert admin_client.get(URL_USERS).json()['count'] == 6
+
+    def test_02_bulk_update(self, admin_client, admin, django_user_model):
+        create_users(admin_client, 2)
+        user = django_user_model.objects.get(username='bulk_0')
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+        )
+        assert client.get('/api/v1/users/me/').status_code == HTTPStatus.OK
+
+        response = admin_client.patch(URL_BULK, data=[
+            {'username': 'bulk_0', 'role': 'moderator'},
+            {'username': 'bulk_1', 'bio': 'Обновлено'},
+            {'username': 'missing', 'bio': 'Нет такого'},
+            {'username': 'bulk_1', 'role': 'unknown'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK
+        statuses = [item['status'] for item in response.json()['results']]
+        assert statuses == [200, 200, 404, 404], (
+            f'Проверьте, что PATCH-запрос к `{URL_BULK}` изменяет найденных '
+            'пользователей и возвращает результат для каждого элемента.'
+        )
+        assert django_user_model.objects.get(
+            username='bulk_0').role == 'moderator'
+        assert django_user_model.objects.get(
+            username='bulk_1').bio == 'Обновлено'
+        assert client.get('/api/v1/users/me/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), (
+            'Проверьте, что изменение роли списком отзывает выданные '
+            'пользователю токены.'
+        )
+
+        response = admin_client.patch(URL_BULK, data=[
+            {'username': 'bulk_1', 'role': 'unknown'},
+        ], format='json')
+        assert response.json()['results'][0]['status'] == 400
+
+    def test_03_bulk_delete(self, admin_client, admin, django_user_model):
+        create_users(admin_client, 2)
+        response = admin_client.delete(
+            URL_BULK, data=['bulk_0', {'username': 'bulk_1'}, 'missing'],
+            format='json'
+        )
+        assert response.status_code == HTTPStatus.OK
+        statuses = [item['status'] for item in response.json()['results']]
+        assert statuses == [204, 204, 404], (
+            f'Проверьте, что DELETE-запрос к `{URL_BULK}` удаляет '
+            'пользователей по списку username.'
+        )
+        assert django_user_model.objects.count() == 1
+
+    def test_04_bulk_permissions_and_format(self, user_client, admin_client):
+        response = user_client.post(URL_BULK, data=[], format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{URL_BULK}` доступен только администратору.'
+        )
+        response = admin_client.post(
+            URL_BULK, data={'username': 'x'}, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
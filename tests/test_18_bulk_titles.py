@@ -0,0 +1,140 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+URL_BULK = '/api/v1/titles/bulk/'
+URL_TITLES = '/api/v1/titles/'
+
+
+@pytest.fixture
+def catalogue():
+    Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    Genre.objects.create(name='Драма', slug='drama')
+    Genre.objects.create(name='Комедия', slug='comedy')
+
+
+def make_titles(count):
+    return [
+        {'name': f'Произведение {number}', 'year': 2000,
+         'category': 'movie', 'genre': ['drama', 'comedy']}
+        for number in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18BulkTitles:
+
+    def test_01_bulk_create(self, admin_client, catalogue):
+        response = admin_client.post(URL_BULK, data=[
+            {'name': 'Первое', 'year': 2001, 'category': 'movie',
+             'genre': ['drama']},
+            {'name': 'Без категории', 'year': 2001, 'category': 'unknown',
+             'genre': ['drama']},
+            {'name': 'Второе', 'year': 2002, 'category': 'book',
+             'genre': ['comedy', 'drama', 'comedy']},
+            {'name': 'Из будущего', 'year': 3000, 'category': 'book',
+             'genre': []},
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()['results']
+        assert [result['status'] for result in results] == [
+            201, 400, 201, 400], (
+            f'Проверьте, что POST-запрос к `{URL_BULK}` создаёт корректные '
+            'произведения и возвращает ошибки для остальных.'
+        )
+        assert 'category' in results[1]['errors']
+        assert 'year' in results[3]['errors']
+        second = Title.objects.get(id=results[2]['id'])
+        assert second.name == 'Второе'
+        assert second.category.slug == 'book'
+        assert set(second.genre.values_list('slug', flat=True)) == {
+            'comedy', 'drama'}, (
+            'Проверьте, что жанры созданных списком произведений сохраняются.'
+        )
+        assert admin_client.get(URL_TITLES).json()['count'] == 2
+
+    def test_02_bulk_create_queries(self, admin_client, catalogue):
+        admin_client.get(URL_TITLES)
+        counts = []
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(
+                    URL_BULK, data=make_titles(size), format='json')
+            assert response.status_code == HTTPStatus.OK
+            counts.append(len(context.captured_queries))
+        assert counts[0] == counts[1], (
+            'Проверьте, что число запросов при создании произведений списком '
+            'не зависит от числа элементов.'
+        )
+        assert Title.objects.count() == 22
+        assert Title.genre.through.objects.count() == 44
+        assert counts[1] <= 8
+
+    def test_03_bulk_update(self, admin_client, catalogue):
+        results = admin_client.post(
+            URL_BULK, data=make_titles(2), format='json').json()['results']
+        first, second = (result['id'] for result in results)
+        response = admin_client.patch(URL_BULK, data=[
+            {'id': first, 'name': 'Новое название', 'genre': ['comedy']},
+            {'id': second, 'category': 'book'},
+            {'id': 0, 'name': 'Нет такого'},
+            {'id': second, 'year': 1999},
+            {'name': 'Без id'},
+        ], format='json')
+        assert response.status_code == HTTPStatus.OK
+        statuses = [item['status'] for item in response.json()['results']]
+        assert statuses == [200, 200, 404, 404, 404], (
+            f'Проверьте, что PATCH-запрос к `{URL_BULK}` изменяет найденные '
+            'произведения и возвращает результат для каждого элемента.'
+        )
+        title = Title.objects.get(id=first)
+        assert title.name == 'Новое название'
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
+        title = Title.objects.get(id=second)
+        assert title.category.slug == 'book'
+        assert title.year == 2000
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'comedy', 'drama'}, (
+            'Проверьте, что жанры не меняются, если их нет в элементе списка.'
+        )
+        data = admin_client.get(f'{URL_TITLES}{first}/').json()
+        assert data['name'] == 'Новое название', (
+            'Проверьте, что изменение произведений списком сбрасывает кэш.'
+        )
+
+    def test_04_deleted_ids_not_reused(self, admin_client, catalogue):
+        results = admin_client.post(
+            URL_BULK, data=make_titles(2), format='json').json()['results']
+        deleted = results[1]['id']
+        response = admin_client.delete(f'{URL_TITLES}{deleted}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        results = admin_client.post(
+            URL_BULK, data=make_titles(2), format='json').json()['results']
+        ids = [result['id'] for result in results]
+        assert deleted not in ids and min(ids) > deleted, (
+            'Проверьте, что произведения, созданные списком, не получают id '
+            'удалённых произведений.'
+        )
+        assert admin_client.post(URL_TITLES, data={
+            'name': 'Одно', 'year': 2000, 'category': 'movie',
+            'genre': ['drama'],
+        }, format='json').json()['id'] > max(ids)
+
+    def test_05_bulk_permissions(self, user_client, moderator_client,
+                                 catalogue):
+        for api_client, expected in (
+                (APIClient(), HTTPStatus.UNAUTHORIZED),
+                (user_client, HTTPStatus.FORBIDDEN),
+                (moderator_client, HTTPStatus.FORBIDDEN)):
+            response = api_client.post(
+                URL_BULK, data=make_titles(1), format='json')
+            assert response.status_code == expected, (
+                f'Проверьте, что только администратор может отправить '
+                f'запрос к `{URL_BULK}`.'
+            )
+        assert not Title.objects.exists()
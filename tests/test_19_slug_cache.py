@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+from api.cache import bump_version
+from api.slugs import slug_maps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title
+
+URL_TITLES = '/api/v1/titles/'
+
+
+@pytest.fixture
+def titles():
+    movie = Category.objects.create(name='Фильм', slug='movie')
+    book = Category.objects.create(name='Книга', slug='book')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    first = Title.objects.create(name='Первое', year=2000, category=movie)
+    first.genre.set((drama, comedy))
+    second = Title.objects.create(name='Второе', year=2001, category=book)
+    second.genre.set((drama,))
+    return first, second
+
+
+def get_names(client, query):
+    response = client.get(f'{URL_TITLES}?{query}')
+    assert response.status_code == HTTPStatus.OK
+    return {title['name'] for title in response.json()['results']}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19SlugCache:
+
+    def test_01_filter_without_join(self, client, titles):
+        get_names(client, 'genre=drama')
+        with CaptureQueriesContext(connection) as context:
+            names = get_names(client, 'genre=comedy&category=movie')
+        assert names == {'Первое'}
+        filtered = [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_genre"."slug" =' in query['sql']
+            or '"reviews_category"."slug" =' in query['sql']
+        ]
+        assert not filtered, (
+            'Проверьте, что фильтр произведений по slug жанра не соединяет '
+            'таблицу жанров, а ищет id в соответствии slug → id.'
+        )
+        assert get_names(client, 'genre=drama') == {'Первое', 'Второе'}
+        assert get_names(client, 'genre=unknown') == set()
+        assert get_names(client, 'category=unknown') == set()
+
+    def test_02_refresh_on_change(self, client, admin_client, titles):
+        assert get_names(client, 'category=book') == {'Второе'}
+        category = Category.objects.get(slug='book')
+        category.slug = 'novel'
+        category.save()
+        assert get_names(client, 'category=book') == set(), (
+            'Проверьте, что соответствие slug → id обновляется при '
+            'изменении категории.'
+        )
+        assert get_names(client, 'category=novel') == {'Второе'}
+
+        assert slug_maps[Genre].get_id('comedy') is not None
+        Genre.objects.filter(slug='comedy').update(slug='farce')
+        assert slug_maps[Genre].get_id('comedy') is not None
+        bump_version(slug_maps[Genre].namespace)
+        assert slug_maps[Genre].get_id('comedy') is None, (
+            'Проверьте, что соответствие slug → id перечитывается при смене '
+            'версии в общем кэше.'
+        )
+
+        Genre.objects.get(slug='drama').delete()
+        response = admin_client.post(URL_TITLES, data={
+            'name': 'Новое', 'year': 2002, 'category': 'novel',
+            'genre': ['drama'],
+        }, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'genre' in response.json()
+
+    def test_03_create_without_slug_queries(self, admin_client, titles):
+        slug_maps[Category].get_values()
+        slug_maps[Genre].get_values()
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(URL_TITLES, data={
+                'name': 'Новое', 'year': 2002, 'category': 'movie',
+                'genre': ['drama', 'comedy'],
+            }, format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['category'] == {
+            'name': 'Фильм', 'slug': 'movie'}
+        lookups = [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_genre"."slug" IN' in query['sql']
+            or '"reviews_genre"."slug" =' in query['sql']
+            or '"reviews_category"."slug" =' in query['sql']
+        ]
+        assert not lookups, (
+            'Проверьте, что категория и жанры произведения ищутся в '
+            'соответствии slug → id без запросов к базе данных.'
+        )
+        title = Title.objects.get(name='Новое')
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'}
+
+    def test_04_changes_from_other_processes(self, client, admin_client,
+                                             titles):
+        assert get_names(client, 'genre=drama') == {'Первое', 'Второе'}
+        # Изменения в обход сигналов, как в процессе с отдельным кэшем.
+        Genre.objects.filter(slug='drama').update(slug='tragedy')
+        assert slug_maps[Genre].get_id('drama') is not None
+        # Прошло SLUG_MAP_MAX_AGE секунд.
+        slug_maps[Genre].expires = 0
+        assert slug_maps[Genre].get_id('drama') is None, (
+            'Проверьте, что соответствие slug → id перечитывается по '
+            'истечении SLUG_MAP_MAX_AGE секунд.'
+        )
+        assert get_names(client, 'genre=tragedy') == {'Первое', 'Второе'}
+
+        slug_maps[Genre].get_values()
+        Genre.objects.bulk_create([Genre(name='Фэнтези', slug='fantasy')])
+        response = admin_client.post(URL_TITLES, data={
+            'name': 'Новое', 'year': 2002, 'category': 'movie',
+            'genre': ['fantasy'],
+        }, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что slug, которого нет в соответствии slug → id, '
+            'ищется в базе данных.'
+        )
+        assert get_names(client, 'genre=fantasy') == {'Новое'}